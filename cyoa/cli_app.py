@@ -1,8 +1,16 @@
 import uuid
 import json
+from collections import Counter, OrderedDict
+from collections.abc import Mapping, MutableMapping
 from datetime import datetime, timezone
-from typing import Optional, List, Tuple, Dict, Set
+from pathlib import Path
+from typing import Optional, List, Tuple, Dict, Set, TextIO
+import argparse
 import logging
+import os
+import re
+import sys
+import time
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -66,8 +74,398 @@ class StoryNode:
         node.last_visited = data.get('last_visited', None)
         return node
 
+# Rough token count: about four characters per token for English prose
+CHARS_PER_TOKEN = 4
+SENTENCE_END = re.compile(r'(?<=[.!?])\s')
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local approximation of a model tokenizer's count."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def write_json_atomic(path: Path, data):
+    """Write JSON next to `path` and rename it into place."""
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+class ShardedNodeStore(MutableMapping):
+    """Story nodes kept as fixed-size JSON shards in a directory and paged in on demand.
+
+    index.json maps each node ID to its shard, so opening a graph reads only
+    the index. Up to cache_shards shards are held in memory, least recently
+    used evicted first. Storing a node marks its shard changed; changed
+    shards stay in memory until flush() writes them, so nothing reaches disk
+    without an explicit save and saving rewrites only the shards involved.
+    A read_only store refuses changes altogether.
+    """
+    index_name = 'index.json'
+
+    def __init__(self, directory: str, cache_shards: int = 16, read_only: bool = False):
+        self.directory = Path(directory)
+        self.read_only = read_only
+        with open(self.directory / self.index_name) as f:
+            index = json.load(f)
+        self.shard_size: int = index['shard_size']
+        self.root_node_id: Optional[str] = index.get('root_node_id')
+        self.shard_of: Dict[str, int] = index['nodes']
+        self.shard_count: int = index['shards']
+        self.shard_lengths = Counter(self.shard_of.values())
+        self.cache_shards = cache_shards
+        self.cache: 'OrderedDict[int, Dict[str, StoryNode]]' = OrderedDict()
+        self.dirty: Set[int] = set()
+        self.index_dirty = False
+
+    @staticmethod
+    def shard_path(directory: Path, shard: int) -> Path:
+        return directory / f'shard_{shard:05d}.json'
+
+    @classmethod
+    def write(cls, directory: str, nodes: Mapping, root_node_id: Optional[str], shard_size: int = 256):
+        """Write a whole graph in the sharded layout, in node order."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        shard_of: Dict[str, int] = {}
+        shard: Dict[str, dict] = {}
+        count = 0
+        for node_id, node in nodes.items():
+            shard[node_id] = node.to_dict()
+            shard_of[node_id] = count
+            if len(shard) == shard_size:
+                write_json_atomic(cls.shard_path(directory, count), shard)
+                shard = {}
+                count += 1
+        if shard:
+            write_json_atomic(cls.shard_path(directory, count), shard)
+            count += 1
+        # Shards left over from a bigger graph
+        stale = count
+        while cls.shard_path(directory, stale).exists():
+            cls.shard_path(directory, stale).unlink()
+            stale += 1
+        index = {'shard_size': shard_size, 'root_node_id': root_node_id, 'shards': count, 'nodes': shard_of}
+        write_json_atomic(directory / cls.index_name, index)
+
+    def _shard(self, shard: int) -> Dict[str, StoryNode]:
+        nodes = self.cache.get(shard)
+        if nodes is not None:
+            self.cache.move_to_end(shard)
+            return nodes
+        path = self.shard_path(self.directory, shard)
+        nodes = {}
+        if path.exists():
+            with open(path) as f:
+                nodes = {node_id: StoryNode.from_dict(data) for node_id, data in json.load(f).items()}
+        self.cache[shard] = nodes
+        if len(self.cache) > self.cache_shards:
+            # Changed shards are pinned until flush()
+            evictable = [cached for cached in self.cache if cached not in self.dirty and cached != shard]
+            for evicted in evictable[:len(self.cache) - self.cache_shards]:
+                del self.cache[evicted]
+        return nodes
+
+    def _check_writable(self):
+        if self.read_only:
+            raise TypeError(f"Story graph '{self.directory}' is open read-only")
+
+    def _write_shard(self, shard: int, nodes: Dict[str, StoryNode]):
+        write_json_atomic(self.shard_path(self.directory, shard),
+                          {node_id: node.to_dict() for node_id, node in nodes.items()})
+        self.dirty.discard(shard)
+
+    def __getitem__(self, node_id: str) -> StoryNode:
+        return self._shard(self.shard_of[node_id])[node_id]
+
+    def __setitem__(self, node_id: str, node: StoryNode):
+        self._check_writable()
+        shard = self.shard_of.get(node_id)
+        if shard is None:
+            shard = self.shard_count - 1
+            if shard < 0 or self.shard_lengths[shard] >= self.shard_size:
+                shard = self.shard_count
+                self.shard_count += 1
+            self.shard_of[node_id] = shard
+            self.shard_lengths[shard] += 1
+            self.index_dirty = True
+        self._shard(shard)[node_id] = node
+        self.dirty.add(shard)
+
+    def __delitem__(self, node_id: str):
+        self._check_writable()
+        shard = self.shard_of.pop(node_id)
+        del self._shard(shard)[node_id]
+        self.shard_lengths[shard] -= 1
+        self.dirty.add(shard)
+        self.index_dirty = True
+
+    def __contains__(self, node_id) -> bool:
+        return node_id in self.shard_of
+
+    def __iter__(self):
+        return iter(self.shard_of)
+
+    def __len__(self) -> int:
+        return len(self.shard_of)
+
+    def flush(self, root_node_id: Optional[str] = None):
+        """Write back changed shards, and the index if nodes were added or removed."""
+        self._check_writable()
+        for shard in sorted(self.dirty):
+            self._write_shard(shard, self.cache[shard])
+        if root_node_id != self.root_node_id:
+            self.root_node_id = root_node_id
+            self.index_dirty = True
+        if self.index_dirty:
+            index = {'shard_size': self.shard_size, 'root_node_id': self.root_node_id,
+                     'shards': self.shard_count, 'nodes': self.shard_of}
+            write_json_atomic(self.directory / self.index_name, index)
+            self.index_dirty = False
+
+class StoryContext:
+    """Story text along a recorded path, built up one node at a time.
+
+    offsets[i] is the length of the text after the first i + 1 nodes, so the
+    context at any earlier step is a prefix slice of the text.
+    """
+    separator = '\n\n'
+
+    def __init__(self):
+        self.node_ids: List[str] = []
+        self.offsets: List[int] = []
+        self.tokens: List[int] = []
+        self.text = ''
+        # The game_state['choices_made'] list the nodes were taken from
+        self.choices: Optional[list] = None
+
+    def append(self, node: StoryNode):
+        """Add a node's content to the end of the context."""
+        text = self.text
+        # Drop our reference first so CPython can grow the string in place
+        # instead of copying it, as long as no caller still holds the old one
+        self.text = ''
+        if self.node_ids:
+            text += self.separator
+        text += node.content
+        self.text = text
+        self.node_ids.append(node.id)
+        self.offsets.append(len(text))
+        self.tokens.append(estimate_tokens(node.content))
+
+    def truncate(self, length: int):
+        """Keep only the first `length` nodes."""
+        del self.node_ids[length:]
+        del self.offsets[length:]
+        del self.tokens[length:]
+        self.text = self.text[:self.offsets[-1]] if self.offsets else ''
+
+    def context_at(self, step: int) -> str:
+        """The context as it was after `step` nodes."""
+        return self.text[:self.offsets[step - 1]] if step > 0 else ''
+
+    def suffix(self, step: int) -> str:
+        """The content of the nodes from `step` onwards."""
+        return self.text[self.offsets[step - 1] + len(self.separator):] if step > 0 else self.text
+
+class ContextBuilder:
+    """Builds generation prompts that fit a token budget.
+
+    The most recent nodes go in verbatim, up to recent_share of the budget.
+    Older nodes are replaced by one-line summaries, newest first, for as long
+    as they fit, and anything older still is only counted. Summaries are
+    cached per node, so building a prompt only touches the nodes that end up
+    in it and costs the same however long the session is.
+    """
+    summary_header = 'Earlier in the story:\n'
+    omitted_note = '[{} earlier scenes omitted]'
+
+    def __init__(self, token_budget: int = 1024, recent_share: float = 0.75, summary_tokens: int = 32):
+        self.token_budget = token_budget
+        self.recent_share = recent_share
+        self.summary_tokens = summary_tokens
+        self.summaries: Dict[str, Tuple[str, str]] = {}  # node ID -> (content, summary)
+
+    def summarize(self, node: StoryNode) -> str:
+        """A node's title and first sentence, cut to summary_tokens."""
+        cached = self.summaries.get(node.id)
+        if cached is None or cached[0] is not node.content:
+            first_sentence = SENTENCE_END.split(node.content.strip(), 1)[0]
+            summary = f"{node.title}: {first_sentence}"
+            limit = self.summary_tokens * CHARS_PER_TOKEN
+            if len(summary) > limit:
+                summary = summary[:limit - 3].rstrip() + '...'
+            cached = self.summaries[node.id] = (node.content, summary)
+        return cached[1]
+
+    def build(self, context: StoryContext, nodes: Dict[str, StoryNode]) -> str:
+        """A prompt context for the path in `context` within the token budget."""
+        steps = len(context.node_ids)
+        if not steps:
+            return ''
+        # The budget in characters, so that separators and the note are
+        # counted exactly and estimate_tokens(prompt) never exceeds it
+        limit = self.token_budget * CHARS_PER_TOKEN
+        separator = '\n\n'
+
+        # Recent nodes verbatim, up to recent_share of the budget; the current node always
+        recent_budget = self.token_budget * self.recent_share
+        start = steps - 1
+        used = context.tokens[start]
+        while start > 0 and used + context.tokens[start - 1] <= recent_budget:
+            start -= 1
+            used += context.tokens[start]
+        recent = context.suffix(start)
+
+        # Room for the omitted note is reserved before cutting the recent text,
+        # unless the note alone would fill the budget
+        note = len(self.omitted_note.format(start) + separator) if start else 0
+        if note >= limit:
+            note = 0
+        if len(recent) > limit - note:
+            recent = recent[len(recent) - (limit - note):]
+
+        # Summaries of the nodes before that, newest first, while they fit
+        summaries = []
+        remaining = limit - len(recent) - note - len(self.summary_header + separator)
+        first = start
+        while note and first > 0:
+            summary = self.summarize(nodes[context.node_ids[first - 1]])
+            # "- " and the newline
+            if len(summary) + 3 > remaining:
+                break
+            summaries.append(summary)
+            remaining -= len(summary) + 3
+            first -= 1
+
+        parts = []
+        if first and note:
+            parts.append(self.omitted_note.format(first))
+        if summaries:
+            parts.append(self.summary_header + '\n'.join(f"- {summary}" for summary in reversed(summaries)))
+        parts.append(recent)
+        return separator.join(parts)
+
+class TrackedAttributes(dict):
+    """Player attributes that remember which names changed since they were last checked."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.changed: Set[str] = set()
+
+    def __setitem__(self, name, value):
+        super().__setitem__(name, value)
+        self.changed.add(name)
+
+    def __delitem__(self, name):
+        super().__delitem__(name)
+        self.changed.add(name)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def update(self, *args, **kwargs):
+        values = dict(*args, **kwargs)
+        super().update(values)
+        self.changed.update(values)
+
+    def pop(self, name, *default):
+        self.changed.add(name)
+        return super().pop(name, *default)
+
+    def popitem(self):
+        name, value = super().popitem()
+        self.changed.add(name)
+        return name, value
+
+    def setdefault(self, name, default=None):
+        self.changed.add(name)
+        return super().setdefault(name, default)
+
+    def clear(self):
+        self.changed.update(self)
+        super().clear()
+
+class ChoiceIndex:
+    """Cached available choices per node, kept current as player attributes change.
+
+    by_attribute maps each attribute to the nodes whose requirements mention
+    it, so a change to one attribute only re-checks those nodes, and only the
+    parents of nodes whose accessibility actually flipped lose their cached
+    choice lists. Nodes are indexed as they are first evaluated rather than
+    up front, since only cached results ever need re-checking; with a sharded
+    graph this touches only the shards play actually reaches. Editing a
+    node's requirements in place is not seen; call reset() afterwards.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forget everything cached."""
+        self.attributes: Optional[TrackedAttributes] = None
+        self.by_attribute: Dict[str, Set[str]] = {}
+        self.parents: Dict[str, Set[str]] = {}
+        self.accessible: Dict[str, bool] = {}
+        self.available: Dict[str, List[str]] = {}
+
+    def add_node(self, node: StoryNode, replaced: bool = False):
+        if replaced:
+            self.reset()
+            return
+        # Choices may already point at this ID
+        self.accessible.pop(node.id, None)
+        for parent_node_id in self.parents.get(node.id, ()):
+            self.available.pop(parent_node_id, None)
+
+    def add_choice(self, from_node_id: str, to_node_id: str):
+        self.available.pop(from_node_id, None)
+
+    def refresh(self, nodes: Dict[str, StoryNode], attributes: TrackedAttributes):
+        """Re-check the cached nodes that depend on attributes changed since the last call."""
+        if attributes is not self.attributes:
+            # New attributes object (new or loaded game): nothing cached still applies
+            self.attributes = attributes
+            self.accessible.clear()
+            self.available.clear()
+            attributes.changed.clear()
+            return
+
+        for attr in attributes.changed:
+            for node_id in self.by_attribute.get(attr, ()):
+                was_accessible = self.accessible.get(node_id)
+                if was_accessible is None:
+                    continue
+                accessible = nodes[node_id].is_accessible(attributes)
+                if accessible != was_accessible:
+                    self.accessible[node_id] = accessible
+                    for parent_node_id in self.parents.get(node_id, ()):
+                        self.available.pop(parent_node_id, None)
+        attributes.changed.clear()
+
+    def is_accessible(self, node_id: str, nodes: Dict[str, StoryNode], attributes: TrackedAttributes) -> bool:
+        accessible = self.accessible.get(node_id)
+        if accessible is None:
+            node = nodes.get(node_id)
+            accessible = self.accessible[node_id] = bool(node) and node.is_accessible(attributes)
+            if node:
+                for attr in node.metadata.get('requirements', {}):
+                    self.by_attribute.setdefault(attr, set()).add(node_id)
+        return accessible
+
+    def choices(self, node: StoryNode, nodes: Dict[str, StoryNode], attributes: TrackedAttributes) -> List[str]:
+        """Choice texts at `node` whose target nodes are accessible."""
+        self.refresh(nodes, attributes)
+        choices = self.available.get(node.id)
+        if choices is None:
+            choices = []
+            for choice_text, child_node_id in node.child_choices.items():
+                self.parents.setdefault(child_node_id, set()).add(node.id)
+                if self.is_accessible(child_node_id, nodes, attributes):
+                    choices.append(choice_text)
+            self.available[node.id] = choices
+        return choices
+
 class TeleportMassiveGame:
-    def __init__(self, session_id: Optional[str] = None):
+    def __init__(self, session_id: Optional[str] = None, context_token_budget: int = 1024,
+                 persist_state: bool = True, track_visits: bool = True):
         # Unique game and session IDs
         self.game_id = f"game_{uuid.uuid4().hex}"
         self.session_id = session_id if session_id else f"session_{uuid.uuid4().hex}"
@@ -75,6 +473,11 @@ class TeleportMassiveGame:
         # Node management
         self.nodes: Dict[str, StoryNode] = {}
         self.root_node_id: Optional[str] = None
+        self.context = StoryContext()
+        self.context_builder = ContextBuilder(context_token_budget)
+        self.choice_index = ChoiceIndex()
+        # Whether update_story counts visits on the nodes
+        self.track_visits = track_visits
 
         # Initialize the story nodes
         self.init_story_nodes()
@@ -87,7 +490,8 @@ class TeleportMassiveGame:
                 self.save_game_state()
         else:
             self.init_game_state()
-            self.save_game_state()
+            if persist_state:
+                self.save_game_state()
 
     def init_story_nodes(self):
         """Initialize the story nodes and build the tree structure."""
@@ -127,7 +531,9 @@ class TeleportMassiveGame:
 
     def add_node(self, node: StoryNode):
         """Add a new node to the story graph."""
+        replaced = node.id in self.nodes
         self.nodes[node.id] = node
+        self.choice_index.add_node(node, replaced)
 
     def get_node(self, node_id: str) -> Optional[StoryNode]:
         """Retrieve a node by its ID."""
@@ -140,29 +546,47 @@ class TeleportMassiveGame:
         if from_node and to_node:
             from_node.add_child(choice_text, to_node_id)
             to_node.add_parent(from_node_id)
+            # Store both back so a sharded graph writes the change
+            self.nodes[from_node_id] = from_node
+            self.nodes[to_node_id] = to_node
+            self.choice_index.add_choice(from_node_id, to_node_id)
         else:
             logger.error(f"Failed to add choice from '{from_node_id}' to '{to_node_id}'")
 
     def traverse_to_node(self, node_id: str) -> List[StoryNode]:
-        """Get the path from the root node to the specified node."""
+        """Get a path from the root node to the specified node by following parent links.
+
+        Where a node has several parents an arbitrary one is followed, so this
+        is only a fallback for states without a recorded path; see recorded_path.
+        """
         path = []
+        seen = set()
         current_node_id = node_id
 
         while current_node_id != self.root_node_id:
             node = self.get_node(current_node_id)
-            if node is None:
-                # Node not found
+            if node is None or current_node_id in seen:
+                # Node not found, or a cycle that never reaches the root
                 return []
-            path.insert(0, node)
+            seen.add(current_node_id)
+            path.append(node)
             if not node.parent_ids:
                 # No parent, cannot proceed
                 return []
-            # Assuming single parent for simplicity
             current_node_id = next(iter(node.parent_ids))
         # Add the root node
         root_node = self.get_node(self.root_node_id)
         if root_node:
-            path.insert(0, root_node)
+            path.append(root_node)
+        path.reverse()
+        return path
+
+    def recorded_path(self) -> List[str]:
+        """Node IDs the player actually visited, from the root to the current node."""
+        path = [self.root_node_id] + [choice['node_id'] for choice in self.game_state.get('choices_made', [])]
+        if path[-1] != self.game_state['current_node_id']:
+            # State without a usable choice log: fall back to parent links
+            path = [node.id for node in self.traverse_to_node(self.game_state['current_node_id'])]
         return path
 
     def init_game_state(self):
@@ -172,34 +596,81 @@ class TeleportMassiveGame:
             "session_id": self.session_id,
             "current_node_id": self.root_node_id,
             "choices_made": [],
-            "player_attributes": {},  # e.g., {"strength": 5, "intelligence": 7}
+            "player_attributes": TrackedAttributes(),  # e.g., {"strength": 5, "intelligence": 7}
             "game_started": datetime.now(timezone.utc).isoformat()
         }
+        self.context = StoryContext()
 
     def update_game_state(self, choice_text: str, next_node_id: str):
         """Update the game state with the player's choice."""
+        previous_node_id = self.game_state['current_node_id']
         self.game_state['current_node_id'] = next_node_id
         self.game_state['choices_made'].append({
             'choice_text': choice_text,
             'node_id': next_node_id,
             'timestamp': datetime.now(timezone.utc).isoformat()
         })
+        next_node = self.get_node(next_node_id)
+        cached = self.context.node_ids
+        if (
+            next_node
+            and cached
+            and cached[-1] == previous_node_id
+            and len(cached) == len(self.game_state['choices_made'])
+            and self.context.choices is self.game_state['choices_made']
+        ):
+            self.context.append(next_node)
 
     def get_available_choices(self) -> List[str]:
         """Get choices available at the current node based on player attributes."""
         current_node = self.get_node(self.game_state['current_node_id'])
-        choices = []
-        for choice_text, child_node_id in current_node.child_choices.items():
-            child_node = self.get_node(child_node_id)
-            if child_node and child_node.is_accessible(self.game_state['player_attributes']):
-                choices.append(choice_text)
-        return choices
+        attributes = self.game_state['player_attributes']
+        if not isinstance(attributes, TrackedAttributes):
+            attributes = self.game_state['player_attributes'] = TrackedAttributes(attributes)
+        return list(self.choice_index.choices(current_node, self.nodes, attributes))
 
     def get_story_context(self) -> str:
         """Retrieve the story context based on the player's path."""
-        path = self.traverse_to_node(self.game_state['current_node_id'])
-        context = '\n\n'.join(node.content for node in path)
-        return context
+        self.sync_context()
+        return self.context.text
+
+    def get_prompt_context(self) -> str:
+        """The story context cut down to the context token budget for generation."""
+        self.sync_context()
+        return self.context_builder.build(self.context, self.nodes)
+
+    def sync_context(self):
+        """Bring the context cache in line with the game state.
+
+        Normal play keeps it current from update_game_state, so this only does
+        work after the state was loaded or changed some other way: the cached
+        nodes are kept if they are still a prefix of the recorded path and the
+        rest are appended.
+        """
+        cached = self.context.node_ids
+        choices = self.game_state.get('choices_made', [])
+        if (
+            cached
+            and len(cached) == len(choices) + 1
+            and cached[-1] == self.game_state['current_node_id']
+            and cached[0] == self.root_node_id
+            and self.context.choices is choices
+        ):
+            return
+
+        path = self.recorded_path()
+        keep = 0
+        while keep < min(len(cached), len(path)) and cached[keep] == path[keep]:
+            keep += 1
+        self.context.truncate(keep)
+        for node_id in path[keep:]:
+            node = self.get_node(node_id)
+            if node is None:
+                logger.error(f"Node '{node_id}' on the recorded path is missing")
+                self.context.truncate(0)
+                return
+            self.context.append(node)
+        self.context.choices = choices
 
     def update_story(self, choice_text: str) -> Tuple[str, List[str]]:
         """Update the game state and generate the next story content."""
@@ -221,11 +692,12 @@ class TeleportMassiveGame:
             self.update_game_state(choice_text, next_node_id)
 
             # Update node visit info
-            next_node.visits += 1
-            next_node.last_visited = datetime.now(timezone.utc).isoformat()
+            if self.track_visits:
+                next_node.visits += 1
+                next_node.last_visited = datetime.now(timezone.utc).isoformat()
 
             # Generate content using AI (placeholder)
-            context = self.get_story_context()
+            context = self.get_prompt_context()
             next_content = generate_story_content(context)
 
             # Prepare next set of choices
@@ -236,15 +708,41 @@ class TeleportMassiveGame:
             logger.exception("Error updating story")
             return 'An unexpected error occurred. Please try again.', []
 
-    def save_story_graph(self, filepath: str = 'story_graph.json'):
-        """Serialize and save the story graph to a file."""
+    def save_story_graph(self, filepath: str = 'story_graph.json', shard_size: Optional[int] = None):
+        """Serialize and save the story graph to a file.
+
+        With shard_size, or when `filepath` is an existing directory, the graph
+        is saved in the sharded layout instead (see ShardedNodeStore). Saving
+        back to the directory a graph was loaded from only rewrites the shards
+        of nodes that changed.
+        """
+        if isinstance(self.nodes, ShardedNodeStore) and Path(filepath).resolve() == self.nodes.directory.resolve():
+            self.nodes.flush(self.root_node_id)
+            return
+        if shard_size or os.path.isdir(filepath):
+            if not shard_size:
+                shard_size = self.nodes.shard_size if isinstance(self.nodes, ShardedNodeStore) else 256
+            ShardedNodeStore.write(filepath, self.nodes, self.root_node_id, shard_size)
+            return
         graph_data = {node_id: node.to_dict() for node_id, node in self.nodes.items()}
         with open(filepath, 'w') as f:
             json.dump(graph_data, f, indent=2)
 
-    def load_story_graph(self, filepath: str = 'story_graph.json'):
-        """Load and deserialize the story graph from a file."""
+    def load_story_graph(self, filepath: str = 'story_graph.json', cache_shards: int = 16,
+                         read_only: bool = False):
+        """Load and deserialize the story graph from a file.
+
+        A sharded directory is opened lazily: only its index is read here, and
+        up to cache_shards shards are paged in as nodes are used. With
+        read_only, a sharded graph refuses any change or save.
+        """
         try:
+            if os.path.isdir(filepath):
+                self.nodes = ShardedNodeStore(filepath, cache_shards, read_only)
+                self.root_node_id = self.nodes.root_node_id or next(iter(self.nodes))
+                self.context = StoryContext()
+                self.choice_index.reset()
+                return
             with open(filepath, 'r') as f:
                 graph_data = json.load(f)
             self.nodes = {}
@@ -253,6 +751,8 @@ class TeleportMassiveGame:
                 self.nodes[node_id] = node
             # Set the root node ID
             self.root_node_id = next(iter(self.nodes))  # Assuming the first node is the root
+            self.context = StoryContext()
+            self.choice_index.reset()
         except Exception as e:
             logger.error(f"Error loading story graph: {e}")
 
@@ -266,6 +766,7 @@ class TeleportMassiveGame:
         try:
             with open(filepath, 'r') as f:
                 self.game_state = json.load(f)
+            self.context = StoryContext()
             return True
         except Exception as e:
             logger.error(f"Error loading game state: {e}")
@@ -279,13 +780,111 @@ def generate_story_content(context: str) -> str:
     """
     return f"{context}\n\n[The story continues based on the player's choices...]"
 
-# Example usage:
+def read_scripts(source: TextIO, name: str) -> List[Tuple[str, List[str]]]:
+    """Split a script file into playthroughs.
 
-if __name__ == '__main__':
-    # Initialize the game
-    game = TeleportMassiveGame()
-
-    # Simulate a game loop
+    One step per line: a 1-based choice number or the choice text. A line
+    "=node_id" expects the game to be at that node. Blank lines or "---"
+    separate playthroughs, and lines starting with "#" are comments.
+    """
+    scripts = []
+    steps: List[str] = []
+    for line in source:
+        line = line.strip()
+        if line.startswith('#'):
+            continue
+        if not line or line == '---':
+            if steps:
+                scripts.append((f"{name}#{len(scripts) + 1}", steps))
+                steps = []
+            continue
+        steps.append(line)
+    if steps:
+        scripts.append((f"{name}#{len(scripts) + 1}", steps))
+    return scripts
+
+def run_script(game: TeleportMassiveGame, name: str, steps: List[str]) -> dict:
+    """Play one script from a fresh game state, timing each step."""
+    game.init_game_state()
+    result = {'script': name, 'status': 'passed', 'error': None, 'steps': []}
+    started = time.perf_counter()
+    for number, step in enumerate(steps, 1):
+        step_started = time.perf_counter()
+        if step.startswith('='):
+            current_node_id = game.game_state['current_node_id']
+            if current_node_id != step[1:].strip():
+                result['error'] = f"step {number}: expected node '{step[1:].strip()}', at '{current_node_id}'"
+        else:
+            choices = game.get_available_choices()
+            if step.isdigit():
+                choice_text = choices[int(step) - 1] if 0 < int(step) <= len(choices) else None
+            else:
+                choice_text = step if step in choices else None
+            if choice_text is None:
+                result['error'] = f"step {number}: '{step}' is not one of {choices}"
+            else:
+                target_node_id = game.get_node(game.game_state['current_node_id']).child_choices[choice_text]
+                game.update_story(choice_text)
+                if game.game_state['current_node_id'] != target_node_id:
+                    result['error'] = f"step {number}: choice '{choice_text}' failed"
+        result['steps'].append({
+            'step': step,
+            'node_id': game.game_state['current_node_id'],
+            'ms': round((time.perf_counter() - step_started) * 1000, 4)
+        })
+        if result['error']:
+            result['status'] = 'failed'
+            break
+    result['total_ms'] = round((time.perf_counter() - started) * 1000, 4)
+    result['final_state'] = {
+        'current_node_id': game.game_state['current_node_id'],
+        'choices_made': len(game.game_state['choices_made']),
+        'player_attributes': dict(game.game_state['player_attributes']),
+        'available_choices': game.get_available_choices()
+    }
+    return result
+
+def run_headless(paths: List[str], graph: Optional[str] = None, report: Optional[str] = None) -> int:
+    """Run playthrough scripts without console rendering; returns the number that failed.
+
+    The graph is only read: it is opened read-only and visits are not counted.
+    """
+    game = TeleportMassiveGame(persist_state=False, track_visits=False)
+    if graph:
+        game.load_story_graph(graph, read_only=True)
+        game.init_game_state()
+    scripts = []
+    for path in paths:
+        if path == '-':
+            scripts.extend(read_scripts(sys.stdin, 'stdin'))
+        else:
+            with open(path) as f:
+                scripts.extend(read_scripts(f, path))
+
+    started = time.perf_counter()
+    results = [run_script(game, name, steps) for name, steps in scripts]
+    elapsed = time.perf_counter() - started
+
+    failed = 0
+    for result in results:
+        if result['status'] == 'failed':
+            failed += 1
+            print(f"FAIL {result['script']}: {result['error']}")
+    step_times = sorted(step['ms'] for result in results for step in result['steps'])
+    if step_times:
+        p50 = step_times[len(step_times) // 2]
+        p95 = step_times[min(len(step_times) - 1, int(len(step_times) * 0.95))]
+        print(f"{len(results)} scripts, {failed} failed, {len(step_times)} steps in {elapsed:.3f}s "
+              f"({len(results) / elapsed:.0f} scripts/s); step p50 {p50:.3f}ms, p95 {p95:.3f}ms, max {step_times[-1]:.3f}ms")
+    else:
+        print("No script steps found")
+    if report:
+        with open(report, 'w') as f:
+            json.dump({'elapsed_s': round(elapsed, 4), 'failed': failed, 'results': results}, f, indent=2)
+    return failed
+
+def play_interactive(game: TeleportMassiveGame):
+    """Simulate a game loop on the console."""
     while True:
         current_node = game.get_node(game.game_state['current_node_id'])
         print(f"\n{current_node.title}")
@@ -313,4 +912,24 @@ if __name__ == '__main__':
             else:
                 print("Invalid choice number.")
         except ValueError:
-            print("Please enter a valid number.")
\ No newline at end of file
+            print("Please enter a valid number.")
+
+# Example usage:
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Teleport Massive CLI")
+    parser.add_argument('--script', action='append', metavar='FILE',
+                        help="run playthrough scripts headless instead of playing ('-' reads stdin); repeatable")
+    parser.add_argument('--graph', help="story graph file or sharded directory to load")
+    parser.add_argument('--report', metavar='FILE', help="write per-step timings and final states as JSON")
+    args = parser.parse_args()
+
+    if args.script:
+        sys.exit(1 if run_headless(args.script, args.graph, args.report) else 0)
+
+    # Initialize the game
+    game = TeleportMassiveGame()
+    if args.graph:
+        game.load_story_graph(args.graph)
+        game.init_game_state()
+    play_interactive(game)
\ No newline at end of file
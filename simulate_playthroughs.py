@@ -0,0 +1,279 @@
+"""
+Monte Carlo playthrough simulator for cli_app story graphs.
+
+Loads a story graph once, compiles it into flat arrays in shared memory and
+runs random walks from the root node across a process pool. Each walk picks
+uniformly among the available choices, or by the target node's
+metadata['weight'] with --policy weighted, until it reaches a node with no
+available choices (an ending) or --max-steps. Requirements are checked
+against --attributes once, when the graph is compiled, since nothing in a
+walk changes player attributes.
+
+Usage:
+    python simulate_playthroughs.py story_graph.json --walks 1000000 [--policy weighted]
+        [--workers 4] [--seed 1] [--json report.json]
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from multiprocessing import Pool, shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from cli_app import TeleportMassiveGame
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Walkers advanced together per numpy step
+BATCH_SIZE = 20000
+# Positions buffered between visit count updates; bounds a worker's memory
+VISIT_BUFFER = 1 << 20
+
+class CompiledGraph:
+    """A story graph as flat arrays.
+
+    Nodes are numbered in graph order and the choices of node i are the edges
+    offsets[i]:offsets[i + 1]. keys[e] is i plus the cumulative probability of
+    edge e within node i, so a walker at node i picks its next edge with one
+    searchsorted of i + uniform(0, 1) over all edges at once.
+    """
+    arrays = ('offsets', 'targets', 'keys', 'degree')
+
+    def __init__(self, node_ids: List[str], root: int, **arrays: np.ndarray):
+        self.node_ids = node_ids
+        self.root = root
+        for name in self.arrays:
+            setattr(self, name, arrays[name])
+
+    @classmethod
+    def compile(cls, game: TeleportMassiveGame, attributes: Dict, policy: str = 'uniform') -> 'CompiledGraph':
+        node_ids = list(game.nodes)
+        index = {node_id: i for i, node_id in enumerate(node_ids)}
+        offsets = np.zeros(len(node_ids) + 1, np.int64)
+        targets: List[int] = []
+        keys: List[float] = []
+        for i, node_id in enumerate(node_ids):
+            children = []
+            for child_node_id in game.nodes[node_id].child_choices.values():
+                child_node = game.get_node(child_node_id)
+                if child_node and child_node.is_accessible(attributes):
+                    weight = float(child_node.metadata.get('weight', 1.0)) if policy == 'weighted' else 1.0
+                    if weight > 0:
+                        children.append((index[child_node_id], weight))
+            total = sum(weight for _, weight in children)
+            cumulative = 0.0
+            for position, (target, weight) in enumerate(children):
+                cumulative += weight
+                targets.append(target)
+                # The last edge ends exactly at i + 1
+                keys.append(i + (cumulative / total if position < len(children) - 1 else 1.0))
+            offsets[i + 1] = len(targets)
+        return cls(
+            node_ids,
+            index[game.root_node_id],
+            offsets=offsets,
+            targets=np.array(targets, np.int64),
+            keys=np.array(keys, np.float64),
+            degree=np.diff(offsets)
+        )
+
+    def share(self) -> Tuple[List[shared_memory.SharedMemory], Dict]:
+        """Copy the arrays into shared memory; returns the blocks and a picklable spec to attach them."""
+        blocks = []
+        spec = {'root': self.root, 'size': len(self.node_ids), 'arrays': {}}
+        for name in self.arrays:
+            array = getattr(self, name)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, array.dtype, buffer=block.buf)[:] = array
+            blocks.append(block)
+            spec['arrays'][name] = (block.name, array.shape, array.dtype.str)
+        return blocks, spec
+
+# Set in each worker by attach()
+_graph: Optional[CompiledGraph] = None
+_blocks: List[shared_memory.SharedMemory] = []
+
+def attach(spec: Dict):
+    """Pool initializer: map the parent's graph arrays without copying or parsing anything."""
+    global _graph
+    arrays = {}
+    for name, (block_name, shape, dtype) in spec['arrays'].items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _blocks.append(block)
+        arrays[name] = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+    _graph = CompiledGraph([None] * spec['size'], spec['root'], **arrays)
+
+def run_walks(task: Tuple[int, np.random.SeedSequence, int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """Run `walks` walks; returns visit and ending counts per node, a path length histogram and the truncated count."""
+    walks, seed, max_steps = task
+    graph = _graph
+    size = len(graph.node_ids)
+    rng = np.random.default_rng(seed)
+    visits = np.zeros(size, np.int64)
+    endings = np.zeros(size, np.int64)
+    lengths = np.zeros(max_steps + 1, np.int64)
+    truncated = 0
+    # Visited positions are batched into bincount calls rather than one
+    # np.add.at per step, which is several times slower
+    buffer = np.empty(max(VISIT_BUFFER, BATCH_SIZE), np.int64)
+    buffered = 0
+
+    def record(position: np.ndarray):
+        nonlocal buffered
+        if buffered + position.size > buffer.size:
+            visits[:] += np.bincount(buffer[:buffered], minlength=size)
+            buffered = 0
+        buffer[buffered:buffered + position.size] = position
+        buffered += position.size
+
+    for start in range(0, walks, BATCH_SIZE):
+        position = np.full(min(BATCH_SIZE, walks - start), graph.root, np.int64)
+        record(position)
+        steps = 0
+        while position.size:
+            ended = graph.degree[position] == 0
+            if ended.any():
+                np.add.at(endings, position[ended], 1)
+                lengths[steps] += np.count_nonzero(ended)
+                position = position[~ended]
+            if steps == max_steps or not position.size:
+                break
+            edge = np.searchsorted(graph.keys, position + rng.random(position.size), side='right')
+            # Guard against i + r rounding up to i + 1 on large graphs
+            np.minimum(edge, graph.offsets[position + 1] - 1, out=edge)
+            position = graph.targets[edge]
+            record(position)
+            steps += 1
+        truncated += position.size
+    visits += np.bincount(buffer[:buffered], minlength=size)
+    return visits, endings, lengths, truncated
+
+def simulate(graph: CompiledGraph, walks: int, workers: int, seed: int, max_steps: int,
+             chunk_size: int = 100000) -> Dict:
+    """Run the walks in chunks over a process pool and merge the histograms.
+
+    Every chunk gets its own child of one SeedSequence, so results depend on
+    the seed and chunk size but not on the number of workers.
+    """
+    chunks = [min(chunk_size, walks - start) for start in range(0, walks, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    tasks = [(count, chunk_seed, max_steps) for count, chunk_seed in zip(chunks, seeds)]
+
+    visits = np.zeros(len(graph.node_ids), np.int64)
+    endings = np.zeros(len(graph.node_ids), np.int64)
+    lengths = np.zeros(max_steps + 1, np.int64)
+    truncated = 0
+    global _graph
+    blocks, spec = graph.share() if workers > 1 else ([], None)
+    started = time.perf_counter()
+    try:
+        if workers > 1:
+            pool = Pool(workers, initializer=attach, initargs=(spec,))
+            results = pool.imap_unordered(run_walks, tasks)
+        else:
+            _graph = graph
+            results = map(run_walks, tasks)
+            pool = None
+        for chunk_visits, chunk_endings, chunk_lengths, chunk_truncated in results:
+            np.add(visits, chunk_visits, out=visits)
+            np.add(endings, chunk_endings, out=endings)
+            np.add(lengths, chunk_lengths, out=lengths)
+            truncated += chunk_truncated
+        if pool:
+            pool.close()
+            pool.join()
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return {
+        'elapsed': time.perf_counter() - started,
+        'visits': visits,
+        'endings': endings,
+        'lengths': lengths,
+        'truncated': truncated
+    }
+
+def build_report(game: TeleportMassiveGame, graph: CompiledGraph, result: Dict, walks: int,
+                 top: int = 10, rare_share: float = 0.001) -> Dict:
+    visits, endings, lengths = result['visits'], result['endings'], result['lengths']
+    finished = int(lengths.sum())
+    steps = np.arange(lengths.size)
+    cumulative = np.cumsum(lengths)
+
+    def percentile(q: float) -> Optional[int]:
+        return int(np.searchsorted(cumulative, q * finished)) if finished else None
+
+    def describe(i: int, count: int) -> Dict:
+        node_id = graph.node_ids[i]
+        return {'node_id': node_id, 'title': game.get_node(node_id).title, 'count': count,
+                'share': round(count / walks, 6)}
+
+    ending_order = np.argsort(endings)[::-1]
+    visit_share = visits / walks
+    rare = np.flatnonzero((visits > 0) & (visit_share < rare_share))
+    never = np.flatnonzero(visits == 0)
+    return {
+        'walks': walks,
+        'elapsed_s': round(result['elapsed'], 3),
+        'walks_per_s': round(walks / result['elapsed']),
+        'steps': int(visits.sum() - walks),
+        'path_length': {
+            'mean': round(float((steps * lengths).sum() / finished), 3) if finished else None,
+            'p50': percentile(0.5),
+            'p95': percentile(0.95),
+            'max': int(steps[lengths > 0].max()) if finished else None
+        },
+        'truncated': result['truncated'],
+        'endings': [describe(i, int(endings[i])) for i in ending_order[:top] if endings[i]],
+        'rarely_visited': [describe(i, int(visits[i])) for i in rare[np.argsort(visits[rare])][:top]],
+        'never_visited': {'count': int(never.size), 'node_ids': [graph.node_ids[i] for i in never[:top]]}
+    }
+
+def print_report(report: Dict):
+    path = report['path_length']
+    print(f"{report['walks']} walks in {report['elapsed_s']}s ({report['walks_per_s']} walks/s), "
+          f"{report['steps']} steps, {report['truncated']} truncated")
+    print(f"path length: mean {path['mean']}, p50 {path['p50']}, p95 {path['p95']}, max {path['max']}")
+    print("endings:")
+    for entry in report['endings']:
+        print(f"  {entry['share']:>9.4%}  {entry['node_id']}  {entry['title']}")
+    print("rarely visited (visits per walk):")
+    for entry in report['rarely_visited']:
+        print(f"  {entry['share']:>9.4%}  {entry['node_id']}  {entry['title']}")
+    never = report['never_visited']
+    print(f"never visited: {never['count']} {never['node_ids']}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('graph', nargs='?', help="story graph file or sharded directory (default: the built-in story)")
+    parser.add_argument('--walks', type=int, default=1000000)
+    parser.add_argument('--policy', choices=('uniform', 'weighted'), default='uniform')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-steps', type=int, default=1000, help="walks longer than this are cut off as truncated")
+    parser.add_argument('--attributes', default='{}', help="player attributes as JSON, for node requirements")
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--json', help="write the report to this file")
+    args = parser.parse_args()
+
+    game = TeleportMassiveGame(persist_state=False)
+    if args.graph:
+        game.load_story_graph(args.graph)
+    started = time.perf_counter()
+    graph = CompiledGraph.compile(game, json.loads(args.attributes), args.policy)
+    logger.info(f"Compiled {len(graph.node_ids)} nodes, {graph.targets.size} choices in {time.perf_counter() - started:.2f}s")
+
+    result = simulate(graph, args.walks, args.workers, args.seed, args.max_steps)
+    report = build_report(game, graph, result, args.walks, args.top)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
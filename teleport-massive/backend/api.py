@@ -1,12 +1,28 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
 from pydantic import BaseModel
-from typing import List, Dict, Optional
-from datetime import datetime
+from typing import Any, List, Dict, Optional, Set
 import uuid
 import json
-from pathlib import Path
-from utils.logger import setup_logger
+import hmac
+from utils.logger import JsonFields, lazy, parse_sample_rates, setup_logger
+from utils.metrics import MetricsRegistry, resolve_route
+from utils.admission import AdmissionController, RequestShed, parse_route_limits
+from utils.tracing import JsonlExporter, Tracer, span
+from utils.profiling import RequestProfiler
+from game.connections import ConnectionManager
+from game.prefetch import parse_known
+from game.stats import StatsCollector
+from game.story_registry import Story, StoryNotFoundError, StoryRegistry
+from game.session_store import SessionBusyError, SessionConflictError, create_session_store
+from config import ADMIN_CONFIG, ADMISSION_CONFIG, LOGGING_CONFIG, PREFETCH_CONFIG, SESSION_CONFIG, STATS_CONFIG, STORY_CONFIG, PROFILING_CONFIG, TRACING_CONFIG
+import asyncio
+import logging
+import random
 import time
 
 # Setup logger
@@ -14,26 +30,173 @@ logger = setup_logger("api")
 
 app = FastAPI()
 
-# Add logging middleware
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start_time = time.time()
+# Request metrics, exposed at /metrics
+metrics = MetricsRegistry()
+http_request_duration = metrics.histogram(
+    "http_request_duration_seconds", "Request latency by route", ("method", "route")
+)
+http_requests_total = metrics.counter(
+    "http_requests_total", "Requests by route and status code", ("method", "route", "status")
+)
+http_requests_in_flight = metrics.gauge(
+    "http_requests_in_flight", "Requests currently being served", ("method", "route")
+)
+http_requests_shed = metrics.counter(
+    "http_requests_shed_total", "Requests refused by admission control", ("route", "reason")
+)
+session_affinity_misses = metrics.counter(
+    "session_affinity_misses_total", "Requests pinned to another worker that landed here"
+).labels()
 
-    # Log request details
-    logger.info(f"Request started: {request.method} {request.url}")
-    logger.debug(f"Headers: {dict(request.headers)}")
+admission = AdmissionController(
+    ADMISSION_CONFIG["max_in_flight"],
+    ADMISSION_CONFIG["max_queue"],
+    ADMISSION_CONFIG["route_limit"],
+    ADMISSION_CONFIG["route_queue"],
+    parse_route_limits(ADMISSION_CONFIG["route_limits"]),
+    ADMISSION_CONFIG["low_priority_routes"],
+    ADMISSION_CONFIG["low_priority_queue_share"],
+    ADMISSION_CONFIG["queue_timeout_seconds"],
+    ADMISSION_CONFIG["exempt_routes"],
+) if ADMISSION_CONFIG["enabled"] else None
+metrics.gauge("admission_queued", "Requests waiting for a worker-wide slot",
+              function=lambda: admission.worker.waiting if admission else 0)
 
-    try:
-        response = await call_next(request)
+# Sampled span tracing, exported to a local JSONL file
+tracer = Tracer(
+    JsonlExporter(TRACING_CONFIG["path"], TRACING_CONFIG["max_bytes"], TRACING_CONFIG["backup_count"]),
+    TRACING_CONFIG["sample_rate"]
+)
 
-        # Log response details
-        process_time = (time.time() - start_time) * 1000
-        logger.info(f"Request completed: {request.method} {request.url} - Status: {response.status_code} - Duration: {process_time:.2f}ms")
+# Opt-in cProfile/tracemalloc capture of single requests carrying a signed token
+profiler = RequestProfiler(
+    ADMIN_CONFIG["token"], PROFILING_CONFIG["header"], PROFILING_CONFIG["query_param"],
+    PROFILING_CONFIG["store_size"], PROFILING_CONFIG["top_n"]
+)
 
-        return response
-    except Exception as e:
-        logger.error(f"Request failed: {request.method} {request.url} - Error: {str(e)}")
-        raise
+# Request logging: two text lines per request, or one sampled JSON record
+json_request_log = LOGGING_CONFIG["format"] == "json"
+request_sample_rates = parse_sample_rates(LOGGING_CONFIG["request_sample_rates"])
+
+def log_request(scope, method: str, route: str, status_code: int, duration: float):
+    """Write the structured record for a finished request, if it is sampled"""
+    level = logging.ERROR if status_code >= 500 else logging.WARNING if status_code >= 400 else logging.INFO
+    rate = request_sample_rates.get(level, 1.0)
+    if not logger.isEnabledFor(level) or (rate < 1.0 and random.random() >= rate):
+        return
+    # Only sampled requests pay for building and serializing the fields
+    session_id = scope.get("path_params", {}).get("session_id") or Request(scope).query_params.get("session_id")
+    fields = JsonFields({
+        "event": "request",
+        "method": method,
+        "route": route,
+        "status": status_code,
+        "duration_ms": round(duration * 1000, 3),
+        "session_id": session_id,
+        "sample_rate": rate
+    })
+    logger.log(level, "%s", fields, extra={"fields": fields})
+
+# Worker identity advertised in the affinity header, when enabled
+affinity_header = SESSION_CONFIG["affinity_header"]
+worker_id = SESSION_CONFIG["worker_id"]
+
+class RequestMiddleware:
+    """Admission control, tracing, metrics and request logging for every HTTP request.
+
+    Written as a plain ASGI middleware rather than with @app.middleware("http"):
+    Starlette's BaseHTTPMiddleware relays the response body through an unbounded
+    queue, so a slow client of a streaming endpoint would pull the whole stream
+    into memory, and it costs an extra task per request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        start_time = time.perf_counter()
+        route = resolve_route(app.router.routes, scope)
+        trace = tracer.start(request.method, route)
+
+        # Admission control: queue for a slot or shed with a fast 503
+        acquired = []
+        if admission:
+            try:
+                with span("admission"):
+                    acquired = await admission.acquire(route)
+            except RequestShed as e:
+                http_requests_shed.labels(route, e.reason).inc()
+                http_requests_total.labels(request.method, route, "503").inc()
+                logger.debug("Request shed (%s): %s %s", e.reason, request.method, route)
+                if trace:
+                    tracer.finish(trace, 503)
+                response = JSONResponse(
+                    {"detail": "Server is overloaded, retry later"},
+                    status_code=503,
+                    headers={"Retry-After": str(ADMISSION_CONFIG["retry_after_seconds"])}
+                )
+                await response(scope, receive, send)
+                return
+
+        in_flight = http_requests_in_flight.labels(request.method, route)
+        in_flight.inc()
+
+        # Log request details
+        if not json_request_log:
+            with span("middleware"):
+                logger.info("Request started: %s %s", request.method, request.url.path)
+                logger.debug("Headers: %s", lazy(dict, request.headers))
+
+        status_code = 500
+        profile = profiler.begin(scope)
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if profile:
+                    MutableHeaders(scope=message)["X-Profile-Id"] = profile.request_id
+                if affinity_header:
+                    pinned = request.headers.get(affinity_header)
+                    if pinned and pinned != worker_id:
+                        session_affinity_misses.inc()
+                    MutableHeaders(scope=message)[affinity_header] = worker_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+            with span("middleware"):
+                # Log response details
+                duration = time.perf_counter() - start_time
+                http_request_duration.labels(request.method, route).observe(duration)
+                http_requests_total.labels(request.method, route, str(status_code)).inc()
+                if json_request_log:
+                    log_request(scope, request.method, route, status_code, duration)
+                else:
+                    logger.info("Request completed: %s %s - Status: %s - Duration: %.2fms",
+                                request.method, request.url.path, status_code, duration * 1000)
+        except Exception as e:
+            http_requests_total.labels(request.method, route, "500").inc()
+            logger.error("Request failed: %s %s - Error: %s", request.method, request.url.path, e)
+            raise
+        finally:
+            in_flight.dec()
+            if acquired:
+                admission.release(acquired)
+            if trace:
+                tracer.finish(trace, status_code)
+            if profile:
+                profiler.end(profile)
+                await run_in_threadpool(profiler.store, profile, request.method, request.url.path, status_code)
+                logger.info(f"Profiled {request.method} {request.url.path} as {profile.request_id}")
+
+# Add logging middleware
+app.add_middleware(RequestMiddleware)
 
 # CORS
 app.add_middleware(
@@ -49,7 +212,7 @@ class Choice(BaseModel):
     id: str
     text: str
     target_node_id: str
-    requirements: Dict[str, any] = {}
+    requirements: Dict[str, Any] = {}
 
 class StoryNode(BaseModel):
     id: str
@@ -57,103 +220,583 @@ class StoryNode(BaseModel):
     title: str
     content: str
     choices: List[Choice]
-    metadata: Dict[str, any] = {}
+    metadata: Dict[str, Any] = {}
     visits: int = 0
     last_visited: Optional[str] = None
 
 class GameState(BaseModel):
     session_id: str
+    story_id: str = STORY_CONFIG["default_story_id"]
     current_node_id: str
     history: List[str] = []
-    player_attributes: Dict[str, any] = {}
+    player_attributes: Dict[str, Any] = {}
+    # Bumped by the session store on every save
+    version: int = 0
+
+# Session storage: in-process by default, shared SQLite for multi-worker deployments
+sessions = create_session_store(
+    SESSION_CONFIG["backend"], GameState, SESSION_CONFIG["db_path"], SESSION_CONFIG["cache_size"],
+    SESSION_CONFIG["snapshot_interval"], SESSION_CONFIG["busy_timeout"]
+)
+
+@app.exception_handler(SessionBusyError)
+async def session_busy(request: Request, exc: SessionBusyError):
+    """Another worker held the session database's write lock past the busy timeout"""
+    logger.warning(f"Session store busy: {request.method} {request.url.path}")
+    return JSONResponse(
+        {"detail": "Session store is busy, retry later"},
+        status_code=503,
+        headers={"Retry-After": str(ADMISSION_CONFIG["retry_after_seconds"])}
+    )
+
+# Stories by story_id, loaded on first use
+stories = StoryRegistry(STORY_CONFIG["stories_dir"], STORY_CONFIG["cache_budget_bytes"], StoryNode)
+
+# Open play sockets, keyed by session
+connections = ConnectionManager()
 
-# In-memory storage
-story_nodes: Dict[str, StoryNode] = {}
-game_states: Dict[str, GameState] = {}
+# Per-worker visit counters, flushed to shared storage
+stats = StatsCollector(STATS_CONFIG["db_path"])
 
-def load_story():
-    """Load story from JSON config file"""
-    story_path = Path("stories/quantum_paradox.json")
+# Counting the SQLite stores is a table scan, so their count is refreshed
+# in a worker thread by the periodic stats task rather than at scrape time
+game_sessions = metrics.gauge("game_sessions", "Sessions in the session store",
+                              function=None if sessions.threaded_io else sessions.count)
+metrics.gauge("game_socket_connections", "Open play sockets on this worker",
+              function=lambda: connections.connection_count())
+metrics.gauge("story_cache_stories", "Stories loaded in this worker", function=lambda: len(stories.loaded()))
+metrics.gauge("story_cache_bytes", "Story JSON bytes loaded in this worker", function=lambda: stories.loaded_bytes)
+metrics.gauge("story_cache_loads", "Story loads since start", function=lambda: stories.loads)
+metrics.gauge("story_cache_evictions", "Story evictions since start", function=lambda: stories.evictions)
+
+async def get_story(story_id: str) -> Story:
+    """Fetch a story from the registry, loading it if cold, or raise 404"""
     try:
-        with open(story_path) as f:
-            story_data = json.load(f)
+        with span("story_lookup"):
+            return await stories.get(story_id)
+    except StoryNotFoundError:
+        raise HTTPException(status_code=404, detail="Story not found")
 
-        for node_data in story_data["nodes"]:
-            story_nodes[node_data["id"]] = StoryNode(**node_data)
+def respond(payload: Dict[str, Any]) -> JSONResponse:
+    """Encode a response payload of plain JSON types.
 
-        return story_data["start_node_id"]
-    except Exception as e:
-        print(f"Error loading story: {e}")
-        raise
+    Node payloads come pre-built from the story cache, so FastAPI's recursive
+    jsonable_encoder pass is skipped.
+    """
+    with span("serialization"):
+        return JSONResponse(payload)
+
+async def flush_stats():
+    """Hand pending counters to a worker thread for the durable merge"""
+    deltas = stats.drain()
+    if deltas:
+        try:
+            await run_in_threadpool(stats.write, deltas)
+        except BaseException:
+            # Nothing was committed; keep the counts for the next flush
+            stats.restore(deltas)
+            raise
+
+async def refresh_session_count():
+    """Update the game_sessions gauge of a SQLite store from a worker thread"""
+    if sessions.threaded_io:
+        game_sessions.labels().set(await run_in_threadpool(sessions.count))
+
+async def flush_stats_periodically():
+    while True:
+        await asyncio.sleep(STATS_CONFIG["flush_interval_seconds"])
+        try:
+            await flush_stats()
+        except Exception as e:
+            logger.error(f"Stats flush failed: {str(e)}")
+        try:
+            await refresh_session_count()
+        except Exception as e:
+            logger.error(f"Session count failed: {str(e)}")
+
+# Startup progress, reported by /readyz
+startup_state: Dict[str, Any] = {"status": "starting", "phases": {}, "stories": {}}
+
+def preload_story_ids() -> List[str]:
+    """Default story plus any configured in PRELOAD_STORIES"""
+    story_ids = [STORY_CONFIG["default_story_id"]]
+    for story_id in (part.strip() for part in STORY_CONFIG["preload"].split(",")):
+        if story_id == "*":
+            story_ids.extend(stories.available())
+        elif story_id:
+            story_ids.append(story_id)
+    return list(dict.fromkeys(story_ids))
+
+async def warm_up():
+    """Load and compile the preloaded stories in parallel, then mark the worker ready.
+
+    Only a failure of the default story keeps the worker unready; other broken
+    stories are logged and reported by /readyz.
+    """
+    started = time.perf_counter()
+    phases = startup_state["phases"]
+
+    story_ids = await run_in_threadpool(preload_story_ids)
+    results = await asyncio.gather(*(stories.get(story_id) for story_id in story_ids), return_exceptions=True)
+    for story_id, result in zip(story_ids, results):
+        if isinstance(result, Exception):
+            logger.error(f"Startup: failed to load story {story_id}: {str(result)}")
+            startup_state["stories"][story_id] = {"status": "failed", "error": str(result) or type(result).__name__}
+        else:
+            startup_state["stories"][story_id] = {"status": "loaded", "nodes": len(result.nodes), **result.timings}
+    phases["stories_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    phase_started = time.perf_counter()
+    await refresh_session_count()
+    phases["session_store_ms"] = round((time.perf_counter() - phase_started) * 1000, 1)
+
+    phases["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    default_loaded = startup_state["stories"][STORY_CONFIG["default_story_id"]]["status"] == "loaded"
+    startup_state["status"] = "ready" if default_loaded else "failed"
+    logger.info(
+        f"Startup {startup_state['status']}: {len(story_ids)} stories in {phases['stories_ms']:.1f}ms, "
+        f"session store in {phases['session_store_ms']:.1f}ms, total {phases['total_ms']:.1f}ms"
+    )
+
+@app.on_event("startup")
+async def startup():
+    # Warmup runs in the background so liveness probes are answered immediately
+    app.state.warm_up = asyncio.create_task(warm_up())
+    app.state.stats_flusher = asyncio.create_task(flush_stats_periodically())
+
+@app.on_event("shutdown")
+async def shutdown():
+    app.state.warm_up.cancel()
+    app.state.stats_flusher.cancel()
+    await flush_stats()
+    await run_in_threadpool(tracer.exporter.close)
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the worker's event loop is serving requests"""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: 200 once startup warmup has loaded the default story"""
+    status_code = 200 if startup_state["status"] == "ready" else 503
+    return JSONResponse(startup_state, status_code=status_code)
 
-# Initialize story when app starts
-start_node_id = load_story()
+def prefetch_bundle(story: Story, node_id: str, depth: int, budget: Optional[int], known: Set[str]) -> Dict[str, Any]:
+    """Clamp client prefetch parameters to the configured limits and build the bundle"""
+    depth = max(0, min(depth, PREFETCH_CONFIG["max_depth"]))
+    budget = PREFETCH_CONFIG["default_budget_bytes"] if budget is None else budget
+    budget = max(0, min(budget, PREFETCH_CONFIG["max_budget_bytes"]))
+    return story.prefetcher.bundle(node_id, depth, budget, known)
 
 @app.post("/game/start")
-async def start_game():
+async def start_game(story_id: str = STORY_CONFIG["default_story_id"], prefetch: int = 0,
+                     prefetch_budget: Optional[int] = None, known: Optional[str] = None):
+    story = await get_story(story_id)
     session_id = str(uuid.uuid4())
     game_state = GameState(
         session_id=session_id,
-        current_node_id=start_node_id,
+        story_id=story.story_id,
+        current_node_id=story.start_node_id,
         history=[],
         player_attributes={}
     )
-    game_states[session_id] = game_state
+    with span("persistence"):
+        sessions.create(game_state)
+    stats.record_visit(story.story_id, story.start_node_id)
 
-    return {
+    response = {
         "session_id": session_id,
-        "node": story_nodes[start_node_id],
+        "story_id": story.story_id,
+        "node": story.payloads[story.start_node_id],
         "player_attributes": game_state.player_attributes
     }
+    if prefetch:
+        response["prefetch"] = prefetch_bundle(story, story.start_node_id, prefetch, prefetch_budget, parse_known(known))
+    return respond(response)
 
-@app.post("/game/choice")
-async def make_choice(session_id: str, choice_id: str):
-    if session_id not in game_states:
+@app.post("/game/start/bulk")
+async def start_games(count: int, story_id: str = STORY_CONFIG["default_story_id"]):
+    """Create `count` sessions at the story's start in one call.
+
+    All sessions start in the same state, so the start node is returned once
+    and the sessions are written as one batch.
+    """
+    if not 1 <= count <= SESSION_CONFIG["bulk_max"]:
+        raise HTTPException(status_code=400, detail=f"count must be between 1 and {SESSION_CONFIG['bulk_max']}")
+    story = await get_story(story_id)
+    session_ids = [str(uuid.uuid4()) for _ in range(count)]
+    template = GameState(
+        session_id="",
+        story_id=story.story_id,
+        current_node_id=story.start_node_id,
+        history=[],
+        player_attributes={}
+    )
+    with span("persistence"):
+        if sessions.threaded_io:
+            await run_in_threadpool(sessions.create_many, template, session_ids)
+        else:
+            sessions.create_many(template, session_ids)
+    stats.record_visit(story.story_id, story.start_node_id, count=count)
+
+    return respond({
+        "session_ids": session_ids,
+        "story_id": story.story_id,
+        "node": story.payloads[story.start_node_id],
+        "player_attributes": template.player_attributes
+    })
+
+def get_session(session_id: str) -> GameState:
+    """Look up a session or raise 404"""
+    with span("session_lookup"):
+        game_state = sessions.get(session_id)
+    if game_state is None:
         raise HTTPException(status_code=404, detail="Game session not found")
+    return game_state
+
+def save_session(game_state: GameState):
+    """Persist a changed session or raise 409 if another worker changed it first"""
+    try:
+        with span("persistence"):
+            sessions.save(game_state)
+    except SessionConflictError:
+        raise HTTPException(status_code=409, detail="Game session was modified concurrently; retry")
 
-    game_state = game_states[session_id]
-    current_node = story_nodes[game_state.current_node_id]
+def apply_choice(story: Story, game_state: GameState, choice_id: str) -> StoryNode:
+    """Advance a session along one of its current node's choices and return the new node"""
+    with span("choice_resolution"):
+        current_node = story.nodes[game_state.current_node_id]
 
-    # Find the chosen choice
-    choice = next((c for c in current_node.choices if c.id == choice_id), None)
-    if not choice:
-        raise HTTPException(status_code=400, detail="Invalid choice")
+        # Find the chosen choice
+        choice = story.choice_index[current_node.id].get(choice_id)
+        if not choice:
+            raise HTTPException(status_code=400, detail="Invalid choice")
 
-    # Update game state
-    game_state.history.append(game_state.current_node_id)
-    game_state.current_node_id = choice.target_node_id
+    with span("state_mutation"):
+        # Update game state
+        game_state.history.append(game_state.current_node_id)
+        game_state.current_node_id = choice.target_node_id
 
-    # Get next node
-    next_node = story_nodes[choice.target_node_id]
-    next_node.visits += 1
-    next_node.last_visited = datetime.now().isoformat()
+        # Get next node
+        next_node = story.nodes[choice.target_node_id]
+        stats.record_transition(story.story_id, current_node.id, next_node.id, is_ending=not next_node.choices)
 
+    return next_node
+
+def history_delta(game_state: GameState, since: Optional[int] = None) -> Dict[str, Any]:
+    """History entries from index `since` on, plus the cursor for the next call.
+
+    History is append-only, so `seq` (the number of entries) only ever grows and
+    a client that passes it back as `since` receives just the new entries.
+    Without `since` the full history is returned.
+    """
+    seq = len(game_state.history)
+    start = 0 if since is None else max(0, min(since, seq))
     return {
-        "node": next_node,
-        "history": game_state.history,
+        "history": game_state.history[start:],
+        "history_start": start,
+        "seq": seq
+    }
+
+@app.post("/game/choice")
+async def make_choice(session_id: str, choice_id: str, since: Optional[int] = None, prefetch: int = 0,
+                      prefetch_budget: Optional[int] = None, known: Optional[str] = None):
+    game_state = get_session(session_id)
+    story = await get_story(game_state.story_id)
+    next_node = apply_choice(story, game_state, choice_id)
+    save_session(game_state)
+    if session_id in connections.active:
+        await connections.publish(session_id, game_state)
+
+    response = {
+        "node": story.payloads[next_node.id],
+        **history_delta(game_state, since),
         "player_attributes": game_state.player_attributes
     }
+    if prefetch:
+        response["prefetch"] = prefetch_bundle(story, next_node.id, prefetch, prefetch_budget, parse_known(known))
+    return respond(response)
 
 @app.get("/game/state/{session_id}")
-async def get_game_state(session_id: str):
+async def get_game_state(session_id: str, since: Optional[int] = None):
     logger.info(f"Getting game state for session: {session_id}")
     try:
-        if session_id not in game_states:
+        with span("session_lookup"):
+            game_state = sessions.get(session_id)
+        if game_state is None:
             logger.warning(f"Session not found: {session_id}")
             raise HTTPException(status_code=404, detail="Game session not found")
+        story = await get_story(game_state.story_id)
 
         logger.debug(f"Current node: {game_state.current_node_id}")
         logger.debug(f"History length: {len(game_state.history)}")
 
-        return {
-            "current_node": story_nodes[game_state.current_node_id],
-            "history": game_state.history,
+        return respond({
+            "story_id": game_state.story_id,
+            "current_node": story.payloads[game_state.current_node_id],
+            **history_delta(game_state, since),
             "player_attributes": game_state.player_attributes
-        }
+        })
     except Exception as e:
         logger.error(f"Error getting game state: {str(e)}", exc_info=True)
         raise
 
+@app.get("/game/history/{session_id}")
+async def get_game_history(session_id: str, before: Optional[int] = None, limit: int = 50):
+    """Page backwards through a session's history.
+
+    Returns up to `limit` entries ending just before index `before` (default: the
+    newest entry). Pass `next_before` back to fetch the preceding page; it is
+    null once the first entry has been returned.
+    """
+    game_state = get_session(session_id)
+    seq = len(game_state.history)
+    limit = max(1, min(limit, 500))
+    end = seq if before is None else max(0, min(before, seq))
+    start = max(0, end - limit)
+
+    return respond({
+        "history": game_state.history[start:end],
+        "history_start": start,
+        "next_before": start if start > 0 else None,
+        "seq": seq
+    })
+
+@app.get("/stories")
+async def list_stories():
+    """Stories available on disk and those currently loaded in this worker"""
+    return {
+        "available": await run_in_threadpool(stories.available),
+        "loaded": stories.loaded()
+    }
+
+@app.get("/stats")
+async def get_stats(story_id: str = STORY_CONFIG["default_story_id"]):
+    """Per-node visits, transitions and endings reached, merged across workers"""
+    return await run_in_threadpool(stats.read, story_id, stats.pending.copy())
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus text exposition of this worker's metrics"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+def require_admin(request: Request):
+    """Raise 403 unless the request carries the admin token"""
+    token = ADMIN_CONFIG["token"]
+    if not token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not hmac.compare_digest(request.headers.get(ADMIN_CONFIG["header"], ""), token):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+@app.get("/admin/sessions/export")
+async def export_sessions(request: Request):
+    """Stream every session as NDJSON, one GameState per line.
+
+    Sessions are read and serialized a batch at a time as the client consumes
+    the stream, so memory stays bounded by the batch size.
+    """
+    require_admin(request)
+    batches = sessions.export_batches(ADMIN_CONFIG["export_batch_size"])
+
+    async def ndjson():
+        exported = 0
+        try:
+            while True:
+                if sessions.threaded_io:
+                    batch = await run_in_threadpool(next, batches, None)
+                else:
+                    batch = next(batches, None)
+                    # Let requests run between batches serialized on the loop
+                    await asyncio.sleep(0)
+                if batch is None:
+                    break
+                if batch:
+                    exported += len(batch)
+                    yield "\n".join(batch) + "\n"
+            logger.info(f"Exported {exported} sessions")
+        finally:
+            batches.close()
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+def parse_sessions(lines: List[bytes], first_line: int):
+    """Validate NDJSON lines into GameStates; returns (sessions, [(line number, error)])"""
+    game_states = []
+    errors = []
+    for line_number, line in enumerate(lines, first_line):
+        if not line.strip():
+            continue
+        try:
+            game_states.append(GameState.parse_raw(line))
+        except ValueError as e:
+            errors.append((line_number, " ".join(str(e).split())[:200]))
+    return game_states, errors
+
+@app.post("/admin/sessions/import")
+async def import_sessions(request: Request):
+    """Ingest NDJSON sessions, as written by the export, in batches.
+
+    The body is read incrementally and written a batch at a time, so memory
+    stays bounded by the batch size. Sessions with an existing id are
+    overwritten. Invalid lines are skipped and reported by line number.
+    """
+    require_admin(request)
+    batch_size = ADMIN_CONFIG["import_batch_size"]
+    imported = 0
+    invalid = 0
+    errors = []
+    batch: List[bytes] = []
+    batch_start = 1
+    remainder = b""
+
+    async def write_batch():
+        nonlocal imported, invalid, batch, batch_start
+        game_states, batch_errors = await run_in_threadpool(parse_sessions, batch, batch_start)
+        if sessions.threaded_io:
+            await run_in_threadpool(sessions.import_batch, game_states)
+        else:
+            sessions.import_batch(game_states)
+        imported += len(game_states)
+        invalid += len(batch_errors)
+        errors.extend(batch_errors[:20 - len(errors)])
+        batch_start += len(batch)
+        batch = []
+
+    async for chunk in request.stream():
+        lines = (remainder + chunk).split(b"\n")
+        remainder = lines.pop()
+        for line in lines:
+            batch.append(line)
+            if len(batch) >= batch_size:
+                await write_batch()
+    if remainder:
+        batch.append(remainder)
+    if batch:
+        await write_batch()
+
+    logger.info(f"Imported {imported} sessions ({invalid} invalid lines)")
+    return {
+        "imported": imported,
+        "invalid": invalid,
+        "errors": [{"line": line_number, "error": error} for line_number, error in errors]
+    }
+
+@app.get("/admin/events")
+async def read_session_events(request: Request, after: int = 0, limit: int = 1000):
+    """Session events in append order, for analytics consumers to tail by cursor"""
+    require_admin(request)
+    if not hasattr(sessions, "read_events"):
+        raise HTTPException(status_code=404, detail="Session events require SESSION_BACKEND=events")
+    events = await run_in_threadpool(sessions.read_events, after, min(max(limit, 1), 10000))
+    return {"events": events, "next_after": events[-1]["id"] if events else after}
+
+@app.get("/admin/profiles")
+async def list_profiles(request: Request):
+    """Profiled requests held by this worker, newest first"""
+    require_admin(request)
+    return {"profiles": profiler.list()}
+
+@app.get("/admin/profiles/{request_id}")
+async def get_profile(request: Request, request_id: str):
+    """Top functions by cumulative time and top allocation sites of a profiled request"""
+    require_admin(request)
+    record = profiler.get(request_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Profile not found on this worker")
+    return {key: value for key, value in record.items() if key != "pstats"}
+
+@app.get("/admin/profiles/{request_id}/pstats")
+async def get_profile_pstats(request: Request, request_id: str):
+    """The raw cProfile stats, loadable with pstats.Stats or snakeviz"""
+    require_admin(request)
+    record = profiler.get(request_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Profile not found on this worker")
+    return Response(record["pstats"], media_type="application/octet-stream",
+                    headers={"Content-Disposition": f"attachment; filename={request_id}.prof"})
+
+@app.websocket("/ws/game/{session_id}")
+async def game_socket(websocket: WebSocket, session_id: str):
+    """Persistent play channel.
+
+    Client messages: {"type": "choice", "choice_id": ...}, {"type": "state"}, {"type": "ping"}.
+    Server messages: "node" after every state change, "prefetch" with compact payloads for
+    nodes one step further on, "error" and "pong". Choices made over REST or on another
+    socket for the same session on this worker are pushed as "node" messages too.
+    Nodes already pushed on this socket are not prefetched again, and "node" messages
+    carry only the history entries added since the previous one.
+    """
+    await websocket.accept()
+    try:
+        game_state = sessions.get(session_id)
+    except SessionBusyError:
+        await websocket.send_json({"type": "error", "status": 503, "detail": "Session store is busy, retry later"})
+        await websocket.close(code=1013)
+        return
+    if game_state is None:
+        await websocket.send_json({"type": "error", "status": 404, "detail": "Game session not found"})
+        await websocket.close(code=4404)
+        return
+
+    sent_tags = set()
+    sent_seq = 0
+    # Updates published by other requests can interleave with this socket's own
+    send_lock = asyncio.Lock()
+
+    async def send_node(game_state: GameState):
+        nonlocal sent_seq
+        async with send_lock:
+            story = await get_story(game_state.story_id)
+            node_id = game_state.current_node_id
+            delta = history_delta(game_state, sent_seq)
+            sent_seq = delta["seq"]
+            await websocket.send_json(jsonable_encoder({
+                "type": "node",
+                "node": story.payloads[node_id],
+                **delta,
+                "player_attributes": game_state.player_attributes
+            }))
+            bundle = prefetch_bundle(story, node_id, 1, None, sent_tags)
+            sent_tags.update(n["tag"] for n in bundle["nodes"])
+            await websocket.send_json({"type": "prefetch", **bundle})
+
+    connections.connect(session_id, websocket, send_node)
+    logger.info(f"Socket opened for session: {session_id}")
+
+    try:
+        await send_node(game_state)
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+                message_type = message.get("type")
+            except (ValueError, AttributeError):
+                await websocket.send_json({"type": "error", "status": 400, "detail": "Malformed message"})
+                continue
+
+            try:
+                # Re-read on every message: other workers may have moved the session on
+                if message_type == "choice":
+                    game_state = get_session(session_id)
+                    apply_choice(await get_story(game_state.story_id), game_state, message.get("choice_id"))
+                    save_session(game_state)
+                    await send_node(game_state)
+                    await connections.publish(session_id, game_state, exclude=websocket)
+                elif message_type == "state":
+                    await send_node(get_session(session_id))
+                elif message_type == "ping":
+                    await websocket.send_json({"type": "pong"})
+                else:
+                    await websocket.send_json({"type": "error", "status": 400, "detail": f"Unknown message type: {message_type}"})
+            except HTTPException as e:
+                await websocket.send_json({"type": "error", "status": e.status_code, "detail": e.detail})
+            except SessionBusyError:
+                await websocket.send_json({"type": "error", "status": 503, "detail": "Session store is busy, retry later"})
+    except WebSocketDisconnect:
+        logger.info(f"Socket closed for session: {session_id}")
+    finally:
+        connections.disconnect(session_id, websocket)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,111 @@
+import os
+import socket
+
+# Log output of setup_logger
+LOGGING_CONFIG = {
+    "dir": os.getenv("LOG_DIR", "logs"),
+    "console_level": os.getenv("LOG_CONSOLE_LEVEL", "INFO"),
+    "file_level": os.getenv("LOG_FILE_LEVEL", "DEBUG"),
+    # text, or json: one JSON object per file line and one sampled record per request
+    "format": os.getenv("LOG_FORMAT", "text"),
+    # json format: share of request records kept per level, e.g. "INFO=0.01,WARNING=1,ERROR=1"
+    # (2xx/3xx log at INFO, 4xx at WARNING, 5xx at ERROR; unlisted levels keep everything)
+    "request_sample_rates": os.getenv("LOG_REQUEST_SAMPLE_RATES", ""),
+    # Write console and file output from a background thread behind a bounded queue
+    "queue": os.getenv("LOG_QUEUE", "1") == "1",
+    "queue_size": int(os.getenv("LOG_QUEUE_SIZE", 10000)),
+    # When the queue is full: drop_new, drop_oldest, or block (up to block_timeout, then drop)
+    "drop_policy": os.getenv("LOG_DROP_POLICY", "drop_new"),
+    "block_timeout": float(os.getenv("LOG_BLOCK_TIMEOUT", 0.05)),
+    # Log files rotate at this size or age (0 disables either), and rotated files are gzipped
+    "max_bytes": int(os.getenv("LOG_MAX_BYTES", 50 * 1024 * 1024)),
+    "rotate_seconds": float(os.getenv("LOG_ROTATE_SECONDS", 24 * 3600)),
+    # Files kept per logger across restarts, and their maximum age (0 keeps any age)
+    "backup_count": int(os.getenv("LOG_BACKUP_COUNT", 20)),
+    "retention_days": float(os.getenv("LOG_RETENTION_DAYS", 14)),
+}
+
+# Story files and the per-worker story cache
+STORY_CONFIG = {
+    "stories_dir": os.getenv("STORIES_DIR", "stories"),
+    "default_story_id": os.getenv("DEFAULT_STORY_ID", "quantum_paradox"),
+    # Measured in bytes of story JSON on disk
+    "cache_budget_bytes": int(os.getenv("STORY_CACHE_BUDGET_BYTES", 64 * 1024 * 1024)),
+    # Loaded during startup warmup: comma separated ids, "*" for every story on disk
+    "preload": os.getenv("PRELOAD_STORIES", ""),
+}
+
+# Speculative prefetch of nodes reachable from the current one
+PREFETCH_CONFIG = {
+    "max_depth": int(os.getenv("PREFETCH_MAX_DEPTH", 3)),
+    "default_budget_bytes": int(os.getenv("PREFETCH_BUDGET_BYTES", 32 * 1024)),
+    "max_budget_bytes": int(os.getenv("PREFETCH_MAX_BUDGET_BYTES", 256 * 1024)),
+}
+
+# Visit, transition and ending counters merged across workers
+STATS_CONFIG = {
+    "db_path": os.getenv("STATS_DB_PATH", "stats.db"),
+    "flush_interval_seconds": float(os.getenv("STATS_FLUSH_INTERVAL", 5)),
+}
+
+# Session storage; "sqlite" shares sessions between uvicorn workers
+SESSION_CONFIG = {
+    # memory (single worker), sqlite (shared rows) or events (shared event log with snapshots)
+    "backend": os.getenv("SESSION_BACKEND", "memory"),
+    "db_path": os.getenv("SESSION_DB_PATH", "sessions.db"),
+    # Parsed sessions kept per worker, revalidated against the row version
+    "cache_size": int(os.getenv("SESSION_CACHE_SIZE", 10000)),
+    # events backend: write a full snapshot every N events per session
+    "snapshot_interval": int(os.getenv("SESSION_SNAPSHOT_INTERVAL", 50)),
+    # sqlite/events: seconds a request waits for another worker's write lock before a 503
+    "busy_timeout": float(os.getenv("SESSION_BUSY_TIMEOUT", 0.2)),
+    # Most sessions one POST /game/start/bulk call may create
+    "bulk_max": int(os.getenv("SESSION_BULK_MAX", 10000)),
+    # Response header naming the worker that served the session; empty disables it
+    "affinity_header": os.getenv("SESSION_AFFINITY_HEADER", ""),
+    "worker_id": os.getenv("WORKER_ID", f"{socket.gethostname()}-{os.getpid()}"),
+}
+
+# Admission control: concurrency caps and load shedding
+ADMISSION_CONFIG = {
+    "enabled": os.getenv("ADMISSION_ENABLED", "1") == "1",
+    # Worker-wide cap on requests being served, and how many may wait for a slot
+    "max_in_flight": int(os.getenv("ADMISSION_MAX_IN_FLIGHT", 256)),
+    "max_queue": int(os.getenv("ADMISSION_MAX_QUEUE", 512)),
+    # Default per-route cap and queue; override with "/route=limit:queue,..."
+    "route_limit": int(os.getenv("ADMISSION_ROUTE_LIMIT", 128)),
+    "route_queue": int(os.getenv("ADMISSION_ROUTE_QUEUE", 256)),
+    "route_limits": os.getenv("ADMISSION_ROUTE_LIMITS", ""),
+    # Session creation yields to in-progress play and may use only this share of a queue
+    "low_priority_routes": ["/game/start", "/game/start/bulk"],
+    "low_priority_queue_share": float(os.getenv("ADMISSION_LOW_PRIORITY_QUEUE_SHARE", 0.25)),
+    "queue_timeout_seconds": float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 2.0)),
+    "retry_after_seconds": int(os.getenv("ADMISSION_RETRY_AFTER", 1)),
+    "exempt_routes": ["/metrics", "/healthz", "/readyz"],
+}
+
+# Admin endpoints (/admin/...) are disabled unless a token is configured
+ADMIN_CONFIG = {
+    "token": os.getenv("ADMIN_TOKEN", ""),
+    "header": "X-Admin-Token",
+    # Sessions per NDJSON chunk; memory-backed exports serialize on the event loop
+    "export_batch_size": int(os.getenv("SESSION_EXPORT_BATCH_SIZE", 500)),
+    "import_batch_size": int(os.getenv("SESSION_IMPORT_BATCH_SIZE", 1000)),
+}
+
+# Per-request profiling, enabled per request by a token signed with the admin token
+PROFILING_CONFIG = {
+    "header": "X-Profile",
+    "query_param": "_profile",
+    # Profiles kept per worker
+    "store_size": int(os.getenv("PROFILE_STORE_SIZE", 50)),
+    "top_n": int(os.getenv("PROFILE_TOP_N", 30)),
+}
+
+# Request span tracing; spans go to a size-rotated local JSONL file
+TRACING_CONFIG = {
+    "sample_rate": float(os.getenv("TRACE_SAMPLE_RATE", 0.01)),
+    "path": os.getenv("TRACE_PATH", "traces/spans.jsonl"),
+    "max_bytes": int(os.getenv("TRACE_MAX_BYTES", 10 * 1024 * 1024)),
+    "backup_count": int(os.getenv("TRACE_BACKUP_COUNT", 5)),
+}
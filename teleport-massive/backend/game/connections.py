@@ -0,0 +1,51 @@
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from fastapi import WebSocket
+from utils.logger import setup_logger
+
+logger = setup_logger("connections")
+
+
+class ConnectionManager:
+    """Track open play sockets per session and push state changes to them.
+
+    Each socket registers a callback that sends it a node update in its own
+    delta/prefetch state. Only sockets on this worker are reached.
+    """
+
+    def __init__(self):
+        # WebSocket objects are unhashable, so sockets are keyed by id()
+        self.active: Dict[str, Dict[int, Tuple[WebSocket, Callable[[Any], Awaitable[None]]]]] = {}
+
+    def connect(self, session_id: str, websocket: WebSocket, on_update: Callable[[Any], Awaitable[None]]):
+        """Register an accepted socket for a session, with the coroutine that pushes a game state to it"""
+        self.active.setdefault(session_id, {})[id(websocket)] = (websocket, on_update)
+
+    def disconnect(self, session_id: str, websocket: WebSocket):
+        """Forget a socket; drops the session entry once its last socket closes"""
+        sockets = self.active.get(session_id)
+        if not sockets:
+            return
+        sockets.pop(id(websocket), None)
+        if not sockets:
+            del self.active[session_id]
+
+    def connection_count(self) -> int:
+        return sum(len(sockets) for sockets in self.active.values())
+
+    async def publish(self, session_id: str, game_state: Any, exclude: Optional[WebSocket] = None) -> int:
+        """Push a changed game state to every socket attached to a session.
+
+        Returns the number of sockets updated. Sockets that fail on send are
+        dropped rather than failing the caller.
+        """
+        delivered = 0
+        for websocket, on_update in list(self.active.get(session_id, {}).values()):
+            if websocket is exclude:
+                continue
+            try:
+                await on_update(game_state)
+                delivered += 1
+            except Exception as e:
+                logger.warning(f"Dropping socket for session {session_id}: {str(e)}")
+                self.disconnect(session_id, websocket)
+        return delivered
@@ -0,0 +1,89 @@
+from collections import deque
+from hashlib import blake2b
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import json
+
+
+def parse_known(known: Optional[str]) -> Set[str]:
+    """Parse a client-supplied comma separated list of node tags"""
+    if not known:
+        return set()
+    return {tag for tag in known.split(",") if tag}
+
+
+class PrefetchBuilder:
+    """Build compact bundles of the nodes reachable from a node.
+
+    Each node is reduced to id, tag, type, title, content and its choices as
+    [id, text, target_node_id] triples. The tag is a short hash of that payload,
+    so clients can list the tags they already hold and an edited node is sent
+    again. Compact payloads and their encoded sizes are computed once per node.
+    """
+
+    def __init__(self, story_nodes: Dict[str, Any]):
+        self.story_nodes = story_nodes
+        self._compact: Dict[str, Tuple[Dict[str, Any], int]] = {}
+
+    def clear(self):
+        self._compact.clear()
+
+    def compact(self, node_id: str) -> Tuple[Dict[str, Any], int]:
+        """Compact payload and its encoded size in bytes for a node"""
+        cached = self._compact.get(node_id)
+        if cached is not None:
+            return cached
+
+        node = self.story_nodes[node_id]
+        payload = {
+            "id": node.id,
+            "type": node.type,
+            "title": node.title,
+            "content": node.content,
+            "choices": [[c.id, c.text, c.target_node_id] for c in node.choices]
+        }
+        encoded = json.dumps(payload, separators=(",", ":")).encode()
+        payload["tag"] = blake2b(encoded, digest_size=4).hexdigest()
+        cached = (payload, len(json.dumps(payload, separators=(",", ":"))))
+        self._compact[node_id] = cached
+        return cached
+
+    def tag(self, node_id: str) -> str:
+        return self.compact(node_id)[0]["tag"]
+
+    def bundle(self, node_id: str, depth: int, budget_bytes: int,
+               known: Iterable[str] = ()) -> Dict[str, Any]:
+        """Nodes up to `depth` steps from `node_id`, nearest first, within a byte budget.
+
+        Nodes whose tag is in `known` are skipped but still walked through, so
+        their children can be bundled. `truncated` is set when the budget cut the
+        walk short.
+        """
+        known = set(known)
+        nodes: List[Dict[str, Any]] = []
+        used = 0
+        truncated = False
+        seen = {node_id}
+        frontier = deque([(node_id, 0)])
+
+        while frontier:
+            current_id, current_depth = frontier.popleft()
+            if current_depth >= depth:
+                continue
+            for choice in self.story_nodes[current_id].choices:
+                target_id = choice.target_node_id
+                if target_id in seen or target_id not in self.story_nodes:
+                    continue
+                seen.add(target_id)
+                frontier.append((target_id, current_depth + 1))
+
+                payload, size = self.compact(target_id)
+                if payload["tag"] in known:
+                    continue
+                if used + size > budget_bytes:
+                    truncated = True
+                    frontier.clear()
+                    break
+                nodes.append(payload)
+                used += size
+
+        return {"depth": depth, "bytes": used, "truncated": truncated, "nodes": nodes}
@@ -0,0 +1,82 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+# Event types
+START = "start"
+CHOICE = "choice"
+ATTRIBUTE = "attribute"
+# Full state replacement, for changes that are not a choice or attribute edit
+RESET = "reset"
+
+Event = Tuple[str, Dict[str, Any]]
+
+_MISSING = object()
+
+
+def state_dict(game_state: Any) -> Dict[str, Any]:
+    return game_state.dict(exclude={"version"})
+
+
+def derive_events(before: Optional[Any], after: Any) -> List[Event]:
+    """Events that turn session state `before` into `after`.
+
+    History only ever grows by choices, so this inspects the new tail of the
+    history and the attributes rather than comparing whole states; any other
+    kind of change is recorded as a single reset event carrying the full state.
+    """
+    if before is None:
+        return [(START, state_dict(after))]
+
+    known = len(before.history)
+    if (
+        after.story_id != before.story_id
+        or len(after.history) < known
+        or (known and after.history[known - 1] != before.history[-1])
+    ):
+        return [(RESET, state_dict(after))]
+
+    events: List[Event] = []
+    steps = after.history[known:]
+    if steps:
+        if steps[0] != before.current_node_id:
+            return [(RESET, state_dict(after))]
+        targets = steps[1:] + [after.current_node_id]
+        events.extend((CHOICE, {"from": source, "to": target}) for source, target in zip(steps, targets))
+    elif after.current_node_id != before.current_node_id:
+        return [(RESET, state_dict(after))]
+
+    changed = {
+        name: value for name, value in after.player_attributes.items()
+        if before.player_attributes.get(name, _MISSING) != value
+    }
+    removed = [name for name in before.player_attributes if name not in after.player_attributes]
+    if changed or removed:
+        events.append((ATTRIBUTE, {"set": changed, "unset": removed}))
+    return events
+
+
+def apply_event(state: Dict[str, Any], event_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply one event to a state dict in place and return it"""
+    if event_type in (START, RESET):
+        state.clear()
+        state.update(data)
+        state["history"] = list(data["history"])
+        state["player_attributes"] = dict(data["player_attributes"])
+    elif event_type == CHOICE:
+        state["history"].append(data["from"])
+        state["current_node_id"] = data["to"]
+    elif event_type == ATTRIBUTE:
+        state["player_attributes"].update(data["set"])
+        for name in data["unset"]:
+            state["player_attributes"].pop(name, None)
+    else:
+        raise ValueError(f"Unknown session event type: {event_type}")
+    return state
+
+
+def replay(state: Optional[Dict[str, Any]], events: List[Event]) -> Optional[Dict[str, Any]]:
+    """Rebuild a state dict from a snapshot (or None) and the events after it"""
+    for event_type, data in events:
+        if state is None:
+            state = {}
+        apply_event(state, event_type, data)
+    return state
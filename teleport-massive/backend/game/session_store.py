@@ -0,0 +1,520 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import functools
+import json
+import sqlite3
+import time
+from game.session_events import RESET, START, derive_events, replay, state_dict
+
+
+class SessionConflictError(Exception):
+    """Raised when a session was changed by another worker since it was read"""
+
+
+class SessionBusyError(Exception):
+    """Raised when the shared database stayed locked past the event loop's busy timeout"""
+
+
+def busy_as_error(method):
+    """Report SQLITE_BUSY on the event loop connection as SessionBusyError"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        except sqlite3.OperationalError as e:
+            if "locked" in str(e) or "busy" in str(e):
+                raise SessionBusyError(str(e)) from e
+            raise
+    return wrapper
+
+
+class MemorySessionStore:
+    """Sessions held in this process only; the single-worker default.
+
+    `get` hands out the live object, so saving only bumps its version.
+    """
+
+    # Export and import must run on the event loop: requests mutate the live
+    # session objects, so they cannot be serialized from another thread
+    threaded_io = False
+
+    def __init__(self):
+        self.sessions: Dict[str, Any] = {}
+
+    def get(self, session_id: str) -> Optional[Any]:
+        return self.sessions.get(session_id)
+
+    def create(self, game_state: Any):
+        game_state.version = 1
+        self.sessions[game_state.session_id] = game_state
+
+    def create_many(self, template: Any, session_ids: List[str]):
+        """Create sessions that differ from `template` only in their id"""
+        for session_id in session_ids:
+            self.sessions[session_id] = template.copy(update={
+                "session_id": session_id,
+                "history": list(template.history),
+                "player_attributes": dict(template.player_attributes),
+                "version": 1
+            })
+
+    def save(self, game_state: Any):
+        game_state.version += 1
+
+    def count(self) -> int:
+        return len(self.sessions)
+
+    def export_batches(self, batch_size: int) -> Iterator[List[str]]:
+        """Sessions as JSON strings, batch by batch.
+
+        Iterates over a snapshot of the session ids, so sessions created during
+        the export are not included.
+        """
+        session_ids = list(self.sessions)
+        for offset in range(0, len(session_ids), batch_size):
+            batch = []
+            for session_id in session_ids[offset:offset + batch_size]:
+                game_state = self.sessions.get(session_id)
+                if game_state is not None:
+                    batch.append(game_state.json(exclude={"version"}))
+            yield batch
+
+    def import_batch(self, game_states: List[Any]):
+        """Insert or overwrite sessions"""
+        for game_state in game_states:
+            existing = self.sessions.get(game_state.session_id)
+            game_state.version = existing.version + 1 if existing else 1
+            self.sessions[game_state.session_id] = game_state
+
+
+class CachedSQLiteStore:
+    """Connection handling and the per-worker LRU cache of parsed sessions shared by the SQLite stores"""
+
+    threaded_io = True
+    # Tables, created when the store opens
+    schema = ""
+
+    def __init__(self, db_path: str, model: Callable[..., Any], cache_size: int = 10000,
+                 busy_timeout: float = 0.2):
+        self.db_path = db_path
+        self.model = model
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.connection = self._connect()
+        self.connection.executescript(self.schema)
+        # Used inline on the event loop from here on, so it must not wait long
+        # for another worker's write lock; worker-thread connections can
+        self.connection.execute(f"PRAGMA busy_timeout = {int(busy_timeout * 1000)}")
+
+    def _connect(self, timeout: float = 30) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _remember(self, game_state: Any):
+        self._cache[game_state.session_id] = game_state
+        self._cache.move_to_end(game_state.session_id)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def _serialize_many(template: Any, session_ids: List[str]) -> Iterator[tuple]:
+        """(session_id, JSON) per id, serializing the template once and splicing in each id"""
+        rest = template.json(exclude={"session_id", "version"})
+        for session_id in session_ids:
+            yield session_id, f'{{"session_id": {json.dumps(session_id)}, {rest[1:]}'
+
+
+class SQLiteSessionStore(CachedSQLiteStore):
+    """Sessions shared between workers through one SQLite file.
+
+    Every row carries a version that is bumped on each save. Each worker keeps
+    an LRU read cache of parsed sessions; a lookup first reads only the row's
+    version and reuses the cached copy when it still matches, so the JSON is
+    parsed again only after another worker changed the session. Saves are
+    compare-and-set on the version and raise SessionConflictError when another
+    worker won the race.
+
+    Queries run inline on the event loop: they are primary key lookups against
+    a WAL database with synchronous=NORMAL, which do not wait on fsync. They
+    can still wait for the write lock while another worker holds it (a bulk
+    import or create, a checkpoint), so the loop connection gives up after
+    busy_timeout seconds and raises SessionBusyError instead of stalling the
+    whole worker. Bulk export and import run in worker threads on their own
+    connections.
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        );
+    """
+
+    @busy_as_error
+    def get(self, session_id: str) -> Optional[Any]:
+        """A private copy of the session, safe to mutate before `save`"""
+        row = self.connection.execute(
+            "SELECT version FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            self._cache.pop(session_id, None)
+            return None
+
+        cached = self._cache.get(session_id)
+        if cached is not None and cached.version == row[0]:
+            self.hits += 1
+            self._cache.move_to_end(session_id)
+            return cached.copy(deep=True)
+
+        self.misses += 1
+        row = self.connection.execute(
+            "SELECT version, data FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        game_state = self.model.parse_raw(row[1])
+        game_state.version = row[0]
+        self._remember(game_state)
+        return game_state.copy(deep=True)
+
+    @busy_as_error
+    def create(self, game_state: Any):
+        game_state.version = 1
+        self.connection.execute(
+            "INSERT INTO sessions (session_id, version, data, updated_at) VALUES (?, ?, ?, ?)",
+            (game_state.session_id, 1, game_state.json(exclude={"version"}), time.time())
+        )
+        self._remember(game_state)
+
+    def create_many(self, template: Any, session_ids: List[str]):
+        """Insert sessions that differ from `template` only in their id, in one transaction (blocking)"""
+        connection = self._connect()
+        try:
+            now = time.time()
+            connection.execute("BEGIN")
+            connection.executemany(
+                "INSERT INTO sessions (session_id, version, data, updated_at) VALUES (?, 1, ?, ?)",
+                [(session_id, data, now) for session_id, data in self._serialize_many(template, session_ids)]
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+    @busy_as_error
+    def save(self, game_state: Any):
+        """Write a session back; the object is cached and must not be mutated afterwards"""
+        cursor = self.connection.execute(
+            "UPDATE sessions SET version = version + 1, data = ?, updated_at = ? "
+            "WHERE session_id = ? AND version = ?",
+            (game_state.json(exclude={"version"}), time.time(), game_state.session_id, game_state.version)
+        )
+        if cursor.rowcount == 0:
+            self._cache.pop(game_state.session_id, None)
+            raise SessionConflictError(game_state.session_id)
+        game_state.version += 1
+        self._remember(game_state)
+
+    def count(self) -> int:
+        """Number of stored sessions; a full table scan (blocking)"""
+        connection = self._connect()
+        try:
+            return connection.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        finally:
+            connection.close()
+
+    def export_batches(self, batch_size: int) -> Iterator[List[str]]:
+        """Stored session JSON in session_id order, batch by batch (blocking).
+
+        Each batch is a separate keyset query, so no read transaction is held
+        open between batches and the WAL can still be checkpointed during a
+        long export.
+        """
+        connection = self._connect()
+        try:
+            after = ""
+            while True:
+                rows = connection.execute(
+                    "SELECT session_id, data FROM sessions WHERE session_id > ? ORDER BY session_id LIMIT ?",
+                    (after, batch_size)
+                ).fetchall()
+                if not rows:
+                    return
+                after = rows[-1][0]
+                yield [data for _, data in rows]
+        finally:
+            connection.close()
+
+    def import_batch(self, game_states: List[Any]):
+        """Insert or overwrite sessions in one transaction (blocking).
+
+        Overwritten rows get a bumped version, so cached copies in every worker
+        are invalidated on their next lookup.
+        """
+        connection = self._connect()
+        try:
+            now = time.time()
+            connection.execute("BEGIN IMMEDIATE")
+            connection.executemany(
+                "INSERT INTO sessions (session_id, version, data, updated_at) VALUES (?, 1, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET version = version + 1, "
+                "data = excluded.data, updated_at = excluded.updated_at",
+                [(game_state.session_id, game_state.json(exclude={"version"}), now) for game_state in game_states]
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+
+class EventSourcedSessionStore(CachedSQLiteStore):
+    """Sessions stored as an append-only log of events, shared through SQLite.
+
+    Each save appends the start, choice and attribute events that produced the
+    change, so its cost does not grow with the session's history the way
+    rewriting the whole session does. Every `snapshot_interval` events the full
+    state is written alongside, so rebuilding a session replays at most that
+    many events on top of its latest snapshot.
+
+    A session's version is the sequence number of its latest event. The
+    (session_id, seq) key makes appends compare-and-set: two workers appending
+    after the same version cannot both succeed. The log also serves as an
+    analytics feed through `read_events`, in global append order.
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS session_events (
+            id INTEGER PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            data TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            UNIQUE (session_id, seq)
+        );
+        CREATE TABLE IF NOT EXISTS session_snapshots (
+            session_id TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL,
+            data TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, db_path: str, model: Callable[..., Any], cache_size: int = 10000,
+                 snapshot_interval: int = 50, busy_timeout: float = 0.2):
+        super().__init__(db_path, model, cache_size, busy_timeout)
+        self.snapshot_interval = snapshot_interval
+
+    def _head(self, session_id: str) -> Optional[int]:
+        return self.connection.execute(
+            "SELECT MAX(seq) FROM session_events WHERE session_id = ?", (session_id,)
+        ).fetchone()[0]
+
+    @busy_as_error
+    def get(self, session_id: str) -> Optional[Any]:
+        """A private copy of the session, safe to mutate before `save`"""
+        head = self._head(session_id)
+        if head is None:
+            self._cache.pop(session_id, None)
+            return None
+
+        cached = self._cache.get(session_id)
+        if cached is not None and cached.version == head:
+            self.hits += 1
+            self._cache.move_to_end(session_id)
+            return cached.copy(deep=True)
+
+        self.misses += 1
+        if cached is not None and cached.version < head:
+            # Another worker appended; replay only what this worker has not seen
+            state, since = state_dict(cached), cached.version
+        else:
+            row = self.connection.execute(
+                "SELECT seq, data FROM session_snapshots WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            state, since = (json.loads(row[1]), row[0]) if row else (None, 0)
+        events = self.connection.execute(
+            "SELECT seq, type, data FROM session_events WHERE session_id = ? AND seq > ? ORDER BY seq",
+            (session_id, since)
+        ).fetchall()
+        state = replay(state, [(event_type, json.loads(data)) for _, event_type, data in events])
+        game_state = self.model(**state)
+        game_state.version = events[-1][0] if events else since
+        self._remember(game_state)
+        return game_state.copy(deep=True)
+
+    def _append(self, game_state: Any, events: List[tuple]):
+        """Append events after game_state.version, snapshotting when an interval boundary is crossed"""
+        base = game_state.version
+        head = base + len(events)
+        now = time.time()
+        try:
+            self.connection.execute("BEGIN")
+            self.connection.executemany(
+                "INSERT INTO session_events (session_id, seq, type, data, created_at) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (game_state.session_id, base + offset, event_type, json.dumps(data, separators=(",", ":")), now)
+                    for offset, (event_type, data) in enumerate(events, 1)
+                ]
+            )
+            if base == 0 or head // self.snapshot_interval > base // self.snapshot_interval:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO session_snapshots (session_id, seq, data) VALUES (?, ?, ?)",
+                    (game_state.session_id, head, game_state.json(exclude={"version"}))
+                )
+            self.connection.execute("COMMIT")
+        except sqlite3.IntegrityError:
+            self.connection.execute("ROLLBACK")
+            self._cache.pop(game_state.session_id, None)
+            raise SessionConflictError(game_state.session_id)
+        except BaseException:
+            if self.connection.in_transaction:
+                self.connection.execute("ROLLBACK")
+            raise
+        game_state.version = head
+        self._remember(game_state)
+
+    @busy_as_error
+    def create(self, game_state: Any):
+        game_state.version = 0
+        self._append(game_state, derive_events(None, game_state))
+
+    def create_many(self, template: Any, session_ids: List[str]):
+        """Append start events and snapshots for sessions that differ from `template` only in their id (blocking)"""
+        connection = self._connect()
+        try:
+            now = time.time()
+            rows = list(self._serialize_many(template, session_ids))
+            connection.execute("BEGIN")
+            connection.executemany(
+                "INSERT INTO session_events (session_id, seq, type, data, created_at) VALUES (?, 1, ?, ?, ?)",
+                [(session_id, START, data, now) for session_id, data in rows]
+            )
+            connection.executemany(
+                "INSERT INTO session_snapshots (session_id, seq, data) VALUES (?, 1, ?)", rows
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+    @busy_as_error
+    def save(self, game_state: Any):
+        """Append the events since the session was read; the object is cached and must not be mutated afterwards"""
+        before = self._cache.get(game_state.session_id)
+        if before is not None and before.version == game_state.version:
+            events = derive_events(before, game_state)
+        else:
+            # The state it was read from is no longer cached
+            events = [(RESET, state_dict(game_state))]
+        if events:
+            self._append(game_state, events)
+
+    def count(self) -> int:
+        """Number of stored sessions; a full table scan (blocking)"""
+        connection = self._connect()
+        try:
+            return connection.execute("SELECT COUNT(*) FROM session_snapshots").fetchone()[0]
+        finally:
+            connection.close()
+
+    def export_batches(self, batch_size: int) -> Iterator[List[str]]:
+        """Rebuilt session JSON in session_id order, batch by batch (blocking)"""
+        connection = self._connect()
+        try:
+            after = ""
+            while True:
+                snapshots = connection.execute(
+                    "SELECT session_id, seq, data FROM session_snapshots WHERE session_id > ? "
+                    "ORDER BY session_id LIMIT ?",
+                    (after, batch_size)
+                ).fetchall()
+                if not snapshots:
+                    return
+                after = snapshots[-1][0]
+                tails: Dict[str, List[tuple]] = {}
+                for session_id, event_type, data in connection.execute(
+                    "SELECT e.session_id, e.type, e.data FROM session_snapshots s "
+                    "JOIN session_events e ON e.session_id = s.session_id AND e.seq > s.seq "
+                    "WHERE s.session_id >= ? AND s.session_id <= ? ORDER BY e.session_id, e.seq",
+                    (snapshots[0][0], after)
+                ):
+                    tails.setdefault(session_id, []).append((event_type, json.loads(data)))
+                batch = []
+                for session_id, _, data in snapshots:
+                    tail = tails.get(session_id)
+                    batch.append(json.dumps(replay(json.loads(data), tail)) if tail else data)
+                yield batch
+        finally:
+            connection.close()
+
+    def import_batch(self, game_states: List[Any]):
+        """Append a reset event and snapshot per session in one transaction (blocking)"""
+        connection = self._connect()
+        try:
+            now = time.time()
+            connection.execute("BEGIN IMMEDIATE")
+            for game_state in game_states:
+                data = game_state.json(exclude={"version"})
+                seq = connection.execute(
+                    "SELECT COALESCE(MAX(seq), 0) + 1 FROM session_events WHERE session_id = ?",
+                    (game_state.session_id,)
+                ).fetchone()[0]
+                connection.execute(
+                    "INSERT INTO session_events (session_id, seq, type, data, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (game_state.session_id, seq, RESET, data, now)
+                )
+                connection.execute(
+                    "INSERT OR REPLACE INTO session_snapshots (session_id, seq, data) VALUES (?, ?, ?)",
+                    (game_state.session_id, seq, data)
+                )
+            connection.execute("COMMIT")
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+    def read_events(self, after_id: int = 0, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Events in global append order after the event id `after_id` (blocking)"""
+        # Its own connection: this runs in a worker thread and must only see
+        # committed events, not ones inside an _append on the event loop
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                "SELECT id, session_id, seq, type, data, created_at FROM session_events WHERE id > ? ORDER BY id LIMIT ?",
+                (after_id, limit)
+            ).fetchall()
+        finally:
+            connection.close()
+        return [
+            {"id": event_id, "session_id": session_id, "seq": seq, "type": event_type,
+             "data": json.loads(data), "created_at": created_at}
+            for event_id, session_id, seq, event_type, data, created_at in rows
+        ]
+
+
+def create_session_store(backend: str, model: Callable[..., Any], db_path: str, cache_size: int,
+                         snapshot_interval: int = 50, busy_timeout: float = 0.2):
+    if backend == "memory":
+        return MemorySessionStore()
+    if backend == "sqlite":
+        return SQLiteSessionStore(db_path, model, cache_size, busy_timeout)
+    if backend == "events":
+        return EventSourcedSessionStore(db_path, model, cache_size, snapshot_interval, busy_timeout)
+    raise ValueError(f"Unknown session backend: {backend}")
@@ -0,0 +1,185 @@
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+import sqlite3
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS node_stats (
+    story_id TEXT NOT NULL,
+    node_id TEXT NOT NULL,
+    visits INTEGER NOT NULL DEFAULT 0,
+    endings INTEGER NOT NULL DEFAULT 0,
+    last_visited TEXT,
+    PRIMARY KEY (story_id, node_id)
+);
+CREATE TABLE IF NOT EXISTS transition_stats (
+    story_id TEXT NOT NULL,
+    from_node_id TEXT NOT NULL,
+    to_node_id TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (story_id, from_node_id, to_node_id)
+);
+"""
+
+
+def isoformat(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+class StatsDeltas:
+    """Counters accumulated by one worker since its last flush"""
+
+    def __init__(self):
+        self.visits: Counter = Counter()
+        self.endings: Counter = Counter()
+        self.transitions: Counter = Counter()
+        # Epoch seconds; converted to ISO timestamps only when flushed or read
+        self.last_visited: Dict[Tuple[str, str], float] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.visits or self.transitions)
+
+    def copy(self) -> "StatsDeltas":
+        deltas = StatsDeltas()
+        deltas.visits = self.visits.copy()
+        deltas.endings = self.endings.copy()
+        deltas.transitions = self.transitions.copy()
+        deltas.last_visited = dict(self.last_visited)
+        return deltas
+
+    def merge(self, other: "StatsDeltas"):
+        """Add another set of counters into this one"""
+        self.visits.update(other.visits)
+        self.endings.update(other.endings)
+        self.transitions.update(other.transitions)
+        for key, timestamp in other.last_visited.items():
+            if timestamp > self.last_visited.get(key, 0):
+                self.last_visited[key] = timestamp
+
+
+class StatsCollector:
+    """Per-worker visit counters, periodically merged into a shared SQLite file.
+
+    Recording only bumps in-memory counters on the event loop thread. `drain()`
+    (also on the loop thread) swaps them out, and `write()` adds the deltas to
+    the durable totals with additive upserts, so any number of workers can flush
+    into the same file and their counts merge. A write is one transaction, so
+    deltas whose write failed can be handed back with `restore()` and retried.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self.pending = StatsDeltas()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        if not self._initialized:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            self._initialized = True
+        return connection
+
+    def record_visit(self, story_id: str, node_id: str, is_ending: bool = False, count: int = 1):
+        key = (story_id, node_id)
+        self.pending.visits[key] += count
+        self.pending.last_visited[key] = time.time()
+        if is_ending:
+            self.pending.endings[key] += count
+
+    def record_transition(self, story_id: str, from_node_id: str, to_node_id: str, is_ending: bool = False):
+        self.pending.transitions[(story_id, from_node_id, to_node_id)] += 1
+        self.record_visit(story_id, to_node_id, is_ending)
+
+    def drain(self) -> StatsDeltas:
+        """Take the pending counters, leaving fresh ones for new increments"""
+        deltas, self.pending = self.pending, StatsDeltas()
+        return deltas
+
+    def restore(self, deltas: StatsDeltas):
+        """Return drained counters that were not written to the pending ones"""
+        self.pending.merge(deltas)
+
+    def write(self, deltas: StatsDeltas):
+        """Add drained counters to the durable totals (blocking; run off the event loop)"""
+        if not deltas:
+            return
+        connection = self._connect()
+        try:
+            with connection:
+                connection.executemany(
+                    """
+                    INSERT INTO node_stats (story_id, node_id, visits, endings, last_visited)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (story_id, node_id) DO UPDATE SET
+                        visits = visits + excluded.visits,
+                        endings = endings + excluded.endings,
+                        last_visited = MAX(COALESCE(last_visited, ''), excluded.last_visited)
+                    """,
+                    [
+                        (story_id, node_id, count, deltas.endings[(story_id, node_id)],
+                         isoformat(deltas.last_visited[(story_id, node_id)]))
+                        for (story_id, node_id), count in deltas.visits.items()
+                    ]
+                )
+                connection.executemany(
+                    """
+                    INSERT INTO transition_stats (story_id, from_node_id, to_node_id, count)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (story_id, from_node_id, to_node_id) DO UPDATE SET
+                        count = count + excluded.count
+                    """,
+                    [(*key, count) for key, count in deltas.transitions.items()]
+                )
+        finally:
+            connection.close()
+
+    def read(self, story_id: str, pending: Optional[StatsDeltas] = None) -> Dict[str, Any]:
+        """Durable totals for a story plus unflushed counts.
+
+        Blocking; when called off the event loop pass `pending.copy()` taken on the
+        loop thread, since recording keeps mutating the live counters.
+        """
+        nodes: Dict[str, Dict[str, Any]] = {}
+        transitions: Counter = Counter()
+
+        if self.db_path.exists():
+            connection = self._connect()
+            try:
+                for node_id, visits, endings, last_visited in connection.execute(
+                    "SELECT node_id, visits, endings, last_visited FROM node_stats WHERE story_id = ?",
+                    (story_id,)
+                ):
+                    nodes[node_id] = {"visits": visits, "endings": endings, "last_visited": last_visited}
+                for from_node_id, to_node_id, count in connection.execute(
+                    "SELECT from_node_id, to_node_id, count FROM transition_stats WHERE story_id = ?",
+                    (story_id,)
+                ):
+                    transitions[(from_node_id, to_node_id)] = count
+            finally:
+                connection.close()
+
+        if pending is not None:
+            for (pending_story, node_id), count in pending.visits.items():
+                if pending_story != story_id:
+                    continue
+                entry = nodes.setdefault(node_id, {"visits": 0, "endings": 0, "last_visited": None})
+                entry["visits"] += count
+                entry["endings"] += pending.endings[(pending_story, node_id)]
+                entry["last_visited"] = max(entry["last_visited"] or "",
+                                            isoformat(pending.last_visited[(pending_story, node_id)]))
+            for (pending_story, from_node_id, to_node_id), count in pending.transitions.items():
+                if pending_story == story_id:
+                    transitions[(from_node_id, to_node_id)] += count
+
+        return {
+            "story_id": story_id,
+            "nodes": nodes,
+            "transitions": [
+                {"from": from_node_id, "to": to_node_id, "count": count}
+                for (from_node_id, to_node_id), count in transitions.most_common()
+            ],
+            "endings": {node_id: entry["endings"] for node_id, entry in nodes.items() if entry["endings"]}
+        }
@@ -0,0 +1,138 @@
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import json
+import re
+import time
+from starlette.concurrency import run_in_threadpool
+from game.prefetch import PrefetchBuilder
+from utils.logger import setup_logger
+
+logger = setup_logger("stories")
+
+STORY_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class StoryNotFoundError(Exception):
+    """Raised when a story_id has no story file"""
+
+
+class Story:
+    """A loaded story graph plus its per-story caches"""
+
+    def __init__(self, story_id: str, start_node_id: str, nodes: Dict[str, Any], size_bytes: int):
+        self.story_id = story_id
+        self.start_node_id = start_node_id
+        self.nodes = nodes
+        self.size_bytes = size_bytes
+        self.prefetcher = PrefetchBuilder(nodes)
+        # Filled by compile()
+        self.choice_index: Dict[str, Dict[str, Any]] = {}
+        self.payloads: Dict[str, Dict[str, Any]] = {}
+        self.timings: Dict[str, float] = {}
+
+    def compile(self):
+        """Precompute choice lookups, response payloads and prefetch payloads for every node.
+
+        Nodes are not mutated after loading, so the cached payloads stay valid for
+        the life of the story.
+        """
+        for node_id, node in self.nodes.items():
+            self.choice_index[node_id] = {choice.id: choice for choice in node.choices}
+            self.payloads[node_id] = node.dict()
+            self.prefetcher.compact(node_id)
+
+
+class StoryRegistry:
+    """Stories keyed by story_id, loaded on first use and evicted LRU.
+
+    Stories are read from `<stories_dir>/<story_id>.json`. Warm lookups never
+    await, and cold loads parse in a worker thread, so loading one story does
+    not stall requests for stories that are already in memory. Concurrent
+    requests for the same cold story share a single load.
+
+    The memory budget is measured in bytes of story JSON on disk; the most
+    recently used story is always kept even if it alone exceeds the budget.
+    """
+
+    def __init__(self, stories_dir: str, budget_bytes: int, node_factory: Callable[..., Any]):
+        self.stories_dir = Path(stories_dir)
+        self.budget_bytes = budget_bytes
+        self.node_factory = node_factory
+        self._stories: "OrderedDict[str, Story]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        self.loaded_bytes = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def story_path(self, story_id: str) -> Path:
+        if not STORY_ID_PATTERN.match(story_id):
+            raise StoryNotFoundError(story_id)
+        return self.stories_dir / f"{story_id}.json"
+
+    def available(self) -> List[str]:
+        """Story ids present on disk"""
+        return sorted(path.stem for path in self.stories_dir.glob("*.json"))
+
+    def loaded(self) -> List[str]:
+        """Story ids currently in memory, least recently used first"""
+        return list(self._stories)
+
+    def peek(self, story_id: str) -> Optional[Story]:
+        """A loaded story without touching its LRU position"""
+        return self._stories.get(story_id)
+
+    async def get(self, story_id: str) -> Story:
+        story = self._stories.get(story_id)
+        if story is not None:
+            self._stories.move_to_end(story_id)
+            return story
+
+        pending = self._loading.get(story_id)
+        if pending is None:
+            pending = asyncio.ensure_future(self._load(story_id))
+            self._loading[story_id] = pending
+            pending.add_done_callback(lambda _: self._loading.pop(story_id, None))
+        # Shielded so one cancelled request does not abort the load for the others
+        return await asyncio.shield(pending)
+
+    async def _load(self, story_id: str) -> Story:
+        started = time.perf_counter()
+        story = await run_in_threadpool(self.read_story, story_id)
+        self._stories[story_id] = story
+        self.loaded_bytes += story.size_bytes
+        self.loads += 1
+        logger.info(
+            f"Loaded story {story_id}: {len(story.nodes)} nodes in {(time.perf_counter() - started) * 1000:.1f}ms "
+            f"(parse {story.timings['parse_ms']:.1f}ms, compile {story.timings['compile_ms']:.1f}ms)"
+        )
+        self._evict()
+        return story
+
+    def read_story(self, story_id: str) -> Story:
+        """Parse and compile a story file into a Story (blocking)"""
+        path = self.story_path(story_id)
+        try:
+            raw = path.read_bytes()
+        except FileNotFoundError:
+            raise StoryNotFoundError(story_id)
+
+        started = time.perf_counter()
+        story_data = json.loads(raw)
+        nodes = {node_data["id"]: self.node_factory(**node_data) for node_data in story_data["nodes"]}
+        story = Story(story_id, story_data["start_node_id"], nodes, len(raw))
+        parsed = time.perf_counter()
+        story.compile()
+        story.timings = {
+            "parse_ms": round((parsed - started) * 1000, 1),
+            "compile_ms": round((time.perf_counter() - parsed) * 1000, 1)
+        }
+        return story
+
+    def _evict(self):
+        while self.loaded_bytes > self.budget_bytes and len(self._stories) > 1:
+            story_id, story = self._stories.popitem(last=False)
+            self.loaded_bytes -= story.size_bytes
+            self.evictions += 1
+            logger.info(f"Evicted story {story_id} ({story.size_bytes} bytes)")
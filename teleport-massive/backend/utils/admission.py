@@ -0,0 +1,129 @@
+from heapq import heappop, heappush
+from itertools import count
+from typing import Dict, Iterable, List, Tuple
+import asyncio
+
+# Lower value is admitted first
+PRIORITY_PLAY = 0
+PRIORITY_LOW = 1
+
+
+class RequestShed(Exception):
+    """Raised when a request is refused admission"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Limiter:
+    """Concurrency cap with a bounded, priority-ordered wait queue.
+
+    A released slot is handed straight to the best waiter rather than returned
+    to the pool, so queued requests cannot be overtaken by new arrivals.
+    """
+
+    def __init__(self, limit: int, queue_size: int):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.active = 0
+        self.waiting = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._order = count()
+
+    async def acquire(self, priority: int, queue_limit: int, timeout: float):
+        if self.active < self.limit and not self.waiting:
+            self.active += 1
+            return
+        if self.waiting >= min(queue_limit, self.queue_size):
+            raise RequestShed("queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        heappush(self._waiters, (priority, next(self._order), future))
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(future, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # The slot arrived as we gave up; pass it on
+                self.release()
+            else:
+                self.waiting -= 1
+            if isinstance(e, asyncio.TimeoutError):
+                raise RequestShed("timeout")
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heappop(self._waiters)
+            if not future.done():
+                self.waiting -= 1
+                future.set_result(None)
+                return
+        self.active -= 1
+
+
+class AdmissionController:
+    """Per-route and worker-wide concurrency caps with load shedding.
+
+    Each request takes a slot on its route's limiter and then on the worker-wide
+    limiter. Low-priority routes (session creation) may only fill a share of the
+    worker-wide queue and are admitted after waiting play requests, so a spike
+    of new players is shed before it slows down players already in a session.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, route_limit: int, route_queue: int,
+                 route_overrides: Dict[str, Tuple[int, int]], low_priority_routes: Iterable[str],
+                 low_priority_queue_share: float, queue_timeout: float, exempt_routes: Iterable[str] = ()):
+        self.worker = Limiter(max_in_flight, max_queue)
+        self.route_limit = route_limit
+        self.route_queue = route_queue
+        self.route_overrides = route_overrides
+        self.low_priority_routes = set(low_priority_routes)
+        self.low_priority_queue_share = low_priority_queue_share
+        self.queue_timeout = queue_timeout
+        self.exempt_routes = set(exempt_routes)
+        self.routes: Dict[str, Limiter] = {}
+
+    def route_limiter(self, route: str) -> Limiter:
+        limiter = self.routes.get(route)
+        if limiter is None:
+            limit, queue_size = self.route_overrides.get(route, (self.route_limit, self.route_queue))
+            limiter = self.routes[route] = Limiter(limit, queue_size)
+        return limiter
+
+    async def acquire(self, route: str) -> List[Limiter]:
+        """Admit a request; returns the limiters to release, or raises RequestShed"""
+        if route in self.exempt_routes:
+            return []
+
+        if route in self.low_priority_routes:
+            priority = PRIORITY_LOW
+            share = self.low_priority_queue_share
+        else:
+            priority = PRIORITY_PLAY
+            share = 1.0
+
+        route_limiter = self.route_limiter(route)
+        await route_limiter.acquire(priority, int(route_limiter.queue_size * share), self.queue_timeout)
+        try:
+            await self.worker.acquire(priority, int(self.worker.queue_size * share), self.queue_timeout)
+        except BaseException:
+            route_limiter.release()
+            raise
+        return [self.worker, route_limiter]
+
+    @staticmethod
+    def release(acquired: List[Limiter]):
+        for limiter in acquired:
+            limiter.release()
+
+
+def parse_route_limits(spec: str) -> Dict[str, Tuple[int, int]]:
+    """Parse "/game/start=16:32,/game/choice=128:256" into {route: (limit, queue)}"""
+    limits = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        route, _, values = entry.rpartition("=")
+        limit, _, queue_size = values.partition(":")
+        limits[route] = (int(limit), int(queue_size or limit))
+    return limits
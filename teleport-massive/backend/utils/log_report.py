@@ -0,0 +1,290 @@
+"""Summarize request latency and errors from log files in one streaming pass.
+
+Understands three line formats, mixed freely across the files given:
+
+- text API logs:  "... - Request completed: GET /game/state/<id> - Status: 200 - Duration: 1.23ms"
+  (older logs with full URLs in place of the path are read too)
+- JSON API logs (LOG_FORMAT=json): {"ts": ..., "event": "request", "route": ..., "duration_ms": ...};
+  sampled records are weighted by 1/sample_rate
+- story_generator.log: 'HTTP Request: POST http://.../api/chat "HTTP/1.1 200 OK"'. These lines carry
+  no duration, so the time since the previous line in the same file is used, which for the
+  blocking LLM calls is the call latency.
+
+Files ending in .gz are decompressed on the fly. Latencies go into fixed
+log-scale histograms (about 2% resolution), so memory depends on the number of
+routes and windows, not on the number of lines.
+
+Usage: python -m utils.log_report logs/api_*.log* ../story_generator.log [--window 5m] [--top 5] [--json out.json]
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+import argparse
+import gzip
+import heapq
+import json
+import math
+import re
+import sys
+
+TEXT_MARKER = b"Request completed: "
+# Matched from just after the marker: method, URL path (scheme, host and query dropped), status, duration
+TEXT_COMPLETED = re.compile(rb"(\S+) (?:\w+://[^/\s]*)?(/[^\s?]*)\S* - Status: (\d+) - Duration: ([\d.]+) ?ms")
+GENERATOR_LINE = re.compile(rb"^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d),(\d+) \| ")
+GENERATOR_REQUEST = re.compile(rb'HTTP Request: (\S+) (?:\w+://[^/\s]*)?(/[^\s?"]*)\S* "HTTP/[\d.]+ (\d+)')
+ID_SEGMENT = re.compile(rb"/(?:[0-9a-fA-F-]{16,}|\d+)(?=/|$)")
+# Path parameters in JSON records' route templates, e.g. /{session_id}
+PARAM_SEGMENT = re.compile(r"/(?:\{[^/}]*\}|[0-9a-fA-F-]{16,}|\d+)(?=/|$)")
+
+# Histogram buckets grow by 2%: bucket i covers [BASE**i, BASE**(i+1)) microseconds
+BASE = 1.02
+LOG_BASE = math.log(BASE)
+
+
+class RouteKeys:
+    """"METHOD /route" strings with id-like segments and path parameters collapsed to {id}.
+
+    Text lines carry raw paths and JSON records carry route templates; both
+    normalize to the same key so one endpoint is reported once.
+    """
+
+    def __init__(self):
+        self.keys: Dict[Tuple[bytes, bytes], str] = {}
+        self.templates: Dict[Tuple[str, str], str] = {}
+
+    def __call__(self, method: bytes, path: bytes) -> str:
+        template = ID_SEGMENT.sub(b"/{id}", path)
+        key = self.keys.get((method, template))
+        if key is None:
+            key = self.keys[(method, template)] = f"{method.decode()} {template.decode()}"
+        return key
+
+    def from_template(self, method: str, route: str) -> str:
+        key = self.templates.get((method, route))
+        if key is None:
+            key = self.templates[(method, route)] = f"{method} {PARAM_SEGMENT.sub('/{id}', route)}"
+        return key
+
+
+class Histogram:
+    """Weighted log-scale latency histogram"""
+
+    __slots__ = ("buckets", "count", "errors", "client_errors", "max_ms")
+
+    def __init__(self):
+        self.buckets: Dict[int, float] = defaultdict(float)
+        self.count = 0.0
+        self.errors = 0.0
+        self.client_errors = 0.0
+        self.max_ms = 0.0
+
+    def add(self, duration_ms: float, status: int, weight: float):
+        self.buckets[int(math.log(max(duration_ms, 0.001) * 1000) / LOG_BASE)] += weight
+        self.count += weight
+        if status >= 500:
+            self.errors += weight
+        elif status >= 400:
+            self.client_errors += weight
+        if duration_ms > self.max_ms:
+            self.max_ms = duration_ms
+
+    def merge(self, other: "Histogram"):
+        for bucket, weight in other.buckets.items():
+            self.buckets[bucket] += weight
+        self.count += other.count
+        self.errors += other.errors
+        self.client_errors += other.client_errors
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def percentiles(self, quantiles: Tuple[float, ...]) -> List[float]:
+        """Upper bounds, in ms, of the buckets holding each quantile"""
+        results = []
+        ordered = sorted(self.buckets.items())
+        targets = iter(quantiles)
+        target = next(targets, None)
+        seen = 0.0
+        for bucket, weight in ordered:
+            seen += weight
+            while target is not None and seen >= target * self.count:
+                results.append(min(BASE ** (bucket + 1) / 1000, self.max_ms))
+                target = next(targets, None)
+        while len(results) < len(quantiles):
+            results.append(self.max_ms)
+        return results
+
+    def summary(self) -> Dict[str, float]:
+        p50, p95, p99 = self.percentiles((0.5, 0.95, 0.99))
+        return {
+            "count": round(self.count),
+            "p50_ms": round(p50, 3),
+            "p95_ms": round(p95, 3),
+            "p99_ms": round(p99, 3),
+            "max_ms": round(self.max_ms, 3),
+            "error_rate": round(self.errors / self.count, 4) if self.count else 0.0,
+            "client_error_rate": round(self.client_errors / self.count, 4) if self.count else 0.0
+        }
+
+
+class EpochCache:
+    """Epoch seconds for "YYYY-mm-dd HH:MM:SS" stamps, parsing each minute only once"""
+
+    def __init__(self):
+        self.minutes: Dict[bytes, float] = {}
+
+    def __call__(self, stamp: bytes) -> float:
+        minute = stamp[:16]
+        start = self.minutes.get(minute)
+        if start is None:
+            start = self.minutes[minute] = datetime.strptime(minute.decode(), "%Y-%m-%d %H:%M").timestamp()
+        return start + int(stamp[17:19])
+
+
+# (ts, "METHOD /route", status, duration_ms, weight)
+Request = Tuple[float, str, int, float, float]
+
+
+def read_requests(path: str, epoch: EpochCache, route_keys: RouteKeys) -> Iterator[Request]:
+    opener = gzip.open if path.endswith(".gz") else open
+    previous_generator_ts: Optional[float] = None
+    with opener(path, "rb", 1024 * 1024) as f:
+        for line in f:
+            # Cheap substring tests first: most lines are not request lines
+            start = line.find(TEXT_MARKER)
+            if start >= 0:
+                match = TEXT_COMPLETED.match(line, start + len(TEXT_MARKER))
+                if match and line[:4].isdigit():
+                    method, route, status, duration = match.groups()
+                    yield epoch(line[:19]), route_keys(method, route), int(status), float(duration), 1.0
+            elif b'"event":"request"' in line:
+                try:
+                    record = json.loads(line)
+                    yield (record["ts"], route_keys.from_template(record["method"], record["route"]), record["status"],
+                           record["duration_ms"], 1.0 / (record.get("sample_rate") or 1.0))
+                except (ValueError, KeyError):
+                    continue
+            elif b" | " in line:
+                match = GENERATOR_LINE.match(line)
+                if not match:
+                    continue
+                ts = epoch(match.group(1)) + int(match.group(2)) / 1000
+                request = GENERATOR_REQUEST.search(line, match.end())
+                if request and previous_generator_ts is not None:
+                    method, route, status = request.groups()
+                    yield ts, route_keys(method, route), int(status), (ts - previous_generator_ts) * 1000, 1.0
+                previous_generator_ts = ts
+
+
+def parse_window(spec: str) -> int:
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if spec[-1] in units:
+        return int(float(spec[:-1]) * units[spec[-1]])
+    return int(spec)
+
+
+class Report:
+    def __init__(self, window_seconds: int, top: int, route_filter: Optional[str] = None):
+        self.window_seconds = window_seconds
+        self.top = top
+        self.route_filter = route_filter
+        self.windows: Dict[int, Dict[str, Histogram]] = defaultdict(lambda: defaultdict(Histogram))
+        # Min-heaps of (duration_ms, ts, route, status) per window; the overall
+        # slowest are the slowest of these
+        self.slowest: Dict[int, List[Tuple[float, float, str, int]]] = defaultdict(list)
+        self.lines = 0
+
+    def add(self, request: Request):
+        ts, key, status, duration_ms, weight = request
+        if self.route_filter and self.route_filter not in key:
+            return
+        self.lines += 1
+        window = int(ts // self.window_seconds) * self.window_seconds
+        self.windows[window][key].add(duration_ms, status, weight)
+        heap = self.slowest[window]
+        if len(heap) < self.top:
+            heapq.heappush(heap, (duration_ms, ts, key, status))
+        elif duration_ms > heap[0][0]:
+            heapq.heapreplace(heap, (duration_ms, ts, key, status))
+
+    def totals(self) -> Dict[str, Histogram]:
+        totals: Dict[str, Histogram] = defaultdict(Histogram)
+        for routes in self.windows.values():
+            for key, histogram in routes.items():
+                totals[key].merge(histogram)
+        return totals
+
+    def to_dict(self) -> Dict:
+        def slow(heap):
+            return [
+                {"duration_ms": round(duration, 3), "ts": datetime.fromtimestamp(ts).isoformat(timespec="seconds"),
+                 "route": key, "status": status}
+                for duration, ts, key, status in sorted(heap, reverse=True)
+            ]
+
+        return {
+            "window_seconds": self.window_seconds,
+            "routes": {key: histogram.summary() for key, histogram in sorted(self.totals().items())},
+            "slowest": slow(heapq.nlargest(self.top, (entry for heap in self.slowest.values() for entry in heap))),
+            "windows": [
+                {
+                    "start": datetime.fromtimestamp(window).isoformat(timespec="seconds"),
+                    "routes": {key: histogram.summary() for key, histogram in sorted(routes.items())},
+                    "slowest": slow(self.slowest[window])
+                }
+                for window, routes in sorted(self.windows.items())
+            ]
+        }
+
+
+def print_table(routes: Dict[str, Dict], indent: str = ""):
+    print(f"{indent}{'route':<40} {'count':>9} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} "
+          f"{'max ms':>10} {'5xx':>7} {'4xx':>7}")
+    for key, row in routes.items():
+        print(f"{indent}{key:<40} {row['count']:>9} {row['p50_ms']:>10} {row['p95_ms']:>10} {row['p99_ms']:>10} "
+              f"{row['max_ms']:>10} {row['error_rate']:>7.2%} {row['client_error_rate']:>7.2%}")
+
+
+def print_report(summary: Dict):
+    for window in summary["windows"]:
+        print(f"== {window['start']} ({summary['window_seconds']}s)")
+        print_table(window["routes"], "  ")
+        for entry in window["slowest"]:
+            print(f"    slow: {entry['duration_ms']:>10.2f}ms  {entry['ts']}  {entry['route']}  {entry['status']}")
+        print()
+    print("== all windows")
+    print_table(summary["routes"])
+    print("slowest requests:")
+    for entry in summary["slowest"]:
+        print(f"  {entry['duration_ms']:>10.2f}ms  {entry['ts']}  {entry['route']}  {entry['status']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="log files, plain or .gz")
+    parser.add_argument("--window", default="1h", help="window size, e.g. 30s, 5m, 1h, 1d")
+    parser.add_argument("--top", type=int, default=5, help="slowest requests to list per window")
+    parser.add_argument("--route", help="only count routes containing this text")
+    parser.add_argument("--json", help="write the summary to this file")
+    args = parser.parse_args()
+
+    report = Report(parse_window(args.window), args.top, args.route)
+    epoch = EpochCache()
+    route_keys = RouteKeys()
+    for path in args.paths:
+        try:
+            for request in read_requests(path, epoch, route_keys):
+                report.add(request)
+        except OSError as e:
+            print(f"Skipping {path}: {e}", file=sys.stderr)
+
+    if not report.lines:
+        print("No request lines found")
+        return
+    summary = report.to_dict()
+    print_report(summary)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,380 @@
 from rich.console import Console
 from rich.logging import RichHandler
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import atexit
+import gzip
+import json
 import logging
+import os
+import queue
+import shutil
 import sys
+import threading
+import time
 from pathlib import Path
 from datetime import datetime
+from config import LOGGING_CONFIG
 
 # Create logs directory if it doesn't exist
-LOGS_DIR = Path("logs")
+LOGS_DIR = Path(LOGGING_CONFIG["dir"])
 LOGS_DIR.mkdir(exist_ok=True)
 
 # Create console for rich output
 console = Console()
 
+DROP_NEW = "drop_new"
+DROP_OLDEST = "drop_oldest"
+BLOCK = "block"
+
+
+class lazy:
+    """Defer an expensive log argument until the record is actually formatted.
+
+    logger.debug("Headers: %s", lazy(dict, request.headers)) builds the dict
+    only if a handler writes the record, and in queue mode only on the
+    listener thread.
+    """
+
+    __slots__ = ("function", "args")
+
+    def __init__(self, function: Callable[..., Any], *args: Any):
+        self.function = function
+        self.args = args
+
+    def __str__(self) -> str:
+        return str(self.function(*self.args))
+
+
+class JsonFields:
+    """Structured log fields, serialized to JSON the first time any handler formats them.
+
+    Pass as both the message argument and extra={"fields": ...}: the console
+    shows the JSON in its text line, JsonFormatter splices it into its object,
+    and both reuse the one serialization.
+    """
+
+    __slots__ = ("fields", "_text")
+
+    def __init__(self, fields: Dict[str, Any]):
+        self.fields = fields
+        self._text: Optional[str] = None
+
+    def __str__(self) -> str:
+        if self._text is None:
+            self._text = json.dumps(self.fields, separators=(",", ":"), default=str)
+        return self._text
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, then the record's fields or its message"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        head = f'{{"ts":{record.created:.3f},"level":"{record.levelname}","logger":{json.dumps(record.name)}'
+        fields = getattr(record, "fields", None)
+        if isinstance(fields, JsonFields):
+            text = str(fields)
+            return f"{head},{text[1:]}" if text != "{}" else f"{head}}}"
+        message = record.getMessage()
+        if record.exc_info:
+            message = f"{message}\n{self.formatException(record.exc_info)}"
+        return f'{head},"message":{json.dumps(message)}}}'
+
+
+def parse_sample_rates(spec: str) -> Dict[int, float]:
+    """Parse "INFO=0.01,WARNING=1,ERROR=1" into {logging level: rate}"""
+    rates = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        level, _, rate = entry.partition("=")
+        rates[logging.getLevelName(level.strip().upper())] = float(rate)
+    return rates
+
+
+class BoundedQueueHandler(logging.Handler):
+    """Hands records to the listener thread through a bounded queue.
+
+    Unlike logging.handlers.QueueHandler, records are enqueued unformatted: the
+    message is rendered on the listener thread, not on the caller's. When the
+    queue is full the drop policy decides whether the new record is dropped,
+    the oldest queued record is dropped to make room, or the caller waits up
+    to block_timeout seconds.
+    """
+
+    def __init__(self, records: "queue.Queue", key: str, drop_policy: str = DROP_NEW, block_timeout: float = 0.05):
+        super().__init__()
+        self.records = records
+        self.key = key
+        self.drop_policy = drop_policy
+        self.block_timeout = block_timeout
+        self.dropped = 0
+
+    def emit(self, record: logging.LogRecord):
+        item = (self.key, record)
+        try:
+            self.records.put_nowait(item)
+            return
+        except queue.Full:
+            pass
+
+        if self.drop_policy == BLOCK:
+            try:
+                self.records.put(item, timeout=self.block_timeout)
+                return
+            except queue.Full:
+                pass
+        elif self.drop_policy == DROP_OLDEST:
+            try:
+                self.records.get_nowait()
+                self.records.put_nowait(item)
+            except (queue.Empty, queue.Full):
+                pass
+        self.dropped += 1
+
+
+class LogListener:
+    """One background thread writing queued records to each logger's real handlers"""
+
+    def __init__(self, queue_size: int, report_interval: float = 5.0):
+        self.records: "queue.Queue[Optional[Tuple[str, logging.LogRecord]]]" = queue.Queue(queue_size)
+        self.report_interval = report_interval
+        self.routes: Dict[str, List[logging.Handler]] = {}
+        self.queue_handlers: List[BoundedQueueHandler] = []
+        self._reported: Dict[str, int] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, key: str, handlers: List[logging.Handler], queue_handler: BoundedQueueHandler):
+        self.routes[key] = handlers
+        self.queue_handlers.append(queue_handler)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="log-listener", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def _write(self, key: str, record: logging.LogRecord):
+        for handler in self.routes.get(key, ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def _report_drops(self):
+        for queue_handler in self.queue_handlers:
+            dropped = queue_handler.dropped - self._reported.get(queue_handler.key, 0)
+            if dropped:
+                self._reported[queue_handler.key] = queue_handler.dropped
+                self._write(queue_handler.key, logging.makeLogRecord({
+                    "name": queue_handler.key, "levelno": logging.WARNING, "levelname": "WARNING",
+                    "msg": "Dropped %d log records: log queue full (policy %s)",
+                    "args": (dropped, queue_handler.drop_policy)
+                }))
+
+    def _run(self):
+        while True:
+            try:
+                item = self.records.get(timeout=self.report_interval)
+            except queue.Empty:
+                self._report_drops()
+                continue
+            if item is None:
+                break
+            # Handler.handle reports its own errors, so a broken handler cannot stop the thread
+            self._write(*item)
+            if self.records.empty():
+                self._report_drops()
+        self._report_drops()
+
+    def stop(self):
+        """Write out everything queued, then stop the thread"""
+        if self._thread is not None and self._thread.is_alive():
+            self.records.put(None)
+            self._thread.join(timeout=10)
+
+
+class Compressor:
+    """Background thread that gzips rotated log files and applies retention.
+
+    Rotation only renames the file, so writers never wait on compression.
+    """
+
+    def __init__(self):
+        self.jobs: "queue.Queue[Tuple[Optional[Path], CompressingRotatingFileHandler]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, path: Optional[Path], handler: "CompressingRotatingFileHandler"):
+        """Compress `path` (if given), then prune the handler's old files"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-compressor", daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+        self.jobs.put((path, handler))
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            path, handler = job
+            try:
+                if path is not None:
+                    compress(path)
+                handler.prune()
+            except OSError as e:
+                # Keep going; the file is retried by the next startup's sweep
+                print(f"Log compression failed for {path}: {e}", file=sys.stderr)
+
+    def stop(self):
+        """Finish queued compressions, then stop the thread"""
+        if self._thread is not None and self._thread.is_alive():
+            self.jobs.put(None)
+            self._thread.join(timeout=30)
+
+
+def compress(path: Path):
+    with open(path, "rb") as source, gzip.open(f"{path}.gz", "wb", compresslevel=6) as target:
+        shutil.copyfileobj(source, target, 1024 * 1024)
+    # Keep the original age for retention
+    modified = path.stat().st_mtime
+    os.utime(f"{path}.gz", (modified, modified))
+    path.unlink()
+
+
+def writer_alive(path: Path) -> bool:
+    """Whether the process that wrote a `<name>_<date>_<time>_<pid>.log...` file is still running"""
+    pid = path.name.split(".log", 1)[0].rsplit("_", 1)[-1]
+    if not pid.isdigit():
+        return False
+    if int(pid) == os.getpid():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+compressor = Compressor()
+
+
+class CompressingRotatingFileHandler(logging.FileHandler):
+    """File handler that rotates by size and by age, compressing rotated files in the background.
+
+    A rotated file is renamed to `<file>.<timestamp>` and gzipped by the
+    compressor thread. Of the files belonging to this logger (earlier processes'
+    files included), at most backup_count are kept, and none older than
+    retention_days. Files of processes that are still running, current or
+    rotated but not yet compressed, are left alone; a dead process's leftovers
+    are compressed and then count like any other rotated file.
+    """
+
+    # Files currently open for writing in this process, never pruned
+    open_files: set = set()
+
+    def __init__(self, filename: Path, logger_name: str, max_bytes: int, rotate_seconds: float,
+                 backup_count: int, retention_days: float):
+        super().__init__(filename)
+        self.path = Path(filename)
+        self.logger_name = logger_name
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backup_count = backup_count
+        self.retention_seconds = retention_days * 86400
+        self.next_rotation = time.time() + rotate_seconds if rotate_seconds else float("inf")
+        self.open_files.add(self.path.resolve())
+        # Sweep files left by earlier processes, compressing any rotated before a crash
+        compressor.submit(None, self)
+
+    def emit(self, record: logging.LogRecord):
+        if self.stream is not None and (
+            time.time() >= self.next_rotation or (self.max_bytes and self.stream.tell() >= self.max_bytes)
+        ):
+            self.rotate()
+        super().emit(record)
+
+    def rotate(self):
+        self.stream.close()
+        self.stream = None
+        rotated = self.path.with_name(f"{self.path.name}.{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+        suffix = 1
+        while rotated.exists() or Path(f"{rotated}.gz").exists():
+            rotated = self.path.with_name(f"{self.path.name}.{datetime.now().strftime('%Y%m%d-%H%M%S')}-{suffix}")
+            suffix += 1
+        os.replace(self.path, rotated)
+        self.stream = self._open()
+        if self.rotate_seconds:
+            self.next_rotation = time.time() + self.rotate_seconds
+        compressor.submit(rotated, self)
+
+    def prune(self):
+        """Compress leftover rotated files, then delete beyond the retention limits (compressor thread)"""
+        files = []
+        for path in self.path.parent.glob(f"{self.logger_name}_*.log*"):
+            if path.resolve() in self.open_files:
+                continue
+            if not path.name.endswith(".gz"):
+                # A running process's current file, or one it rotated and has not
+                # compressed yet: that process owns it. Only finished files count
+                # toward the limits.
+                if writer_alive(path):
+                    continue
+                try:
+                    compress(path)
+                except OSError:
+                    continue
+                path = Path(f"{path}.gz")
+            try:
+                files.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+
+        files.sort(reverse=True)
+        cutoff = time.time() - self.retention_seconds
+        for index, (modified, path) in enumerate(files):
+            if index >= self.backup_count or (self.retention_seconds and modified < cutoff):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def close(self):
+        self.open_files.discard(self.path.resolve())
+        super().close()
+
+
+listener = LogListener(LOGGING_CONFIG["queue_size"]) if LOGGING_CONFIG["queue"] else None
+
+
 def setup_logger(name: str) -> logging.Logger:
-    """Configure and return a logger with both file and console handlers"""
+    """Configure and return a logger with both file and console handlers.
+
+    In queue mode (the default) the logger itself only has a bounded queue
+    handler, and console and file output happen on a background thread.
+    """
 
     # Create logger
     logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
 
     # Prevent adding handlers if they already exist
     if logger.handlers:
         return logger
 
+    console_level = logging.getLevelName(LOGGING_CONFIG["console_level"])
+    file_level = logging.getLevelName(LOGGING_CONFIG["file_level"])
+    # Calls below both handler levels return before a record is even created
+    logger.setLevel(min(console_level, file_level))
+
     # Create formatters
     console_formatter = logging.Formatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
         datefmt='%H:%M:%S'
     )
 
-    file_formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s'
-    )
+    if LOGGING_CONFIG["format"] == "json":
+        file_formatter = JsonFormatter()
+    else:
+        file_formatter = logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s'
+        )
 
     # Console handler with Rich
     console_handler = RichHandler(
@@ -39,19 +382,31 @@ def setup_logger(name: str) -> logging.Logger:
         show_time=False,
         show_path=False
     )
-    console_handler.setLevel(logging.INFO)
+    console_handler.setLevel(console_level)
     console_handler.setFormatter(console_formatter)
 
-    # File handler
+    # File handler, rotated and compressed; the pid keeps workers started together apart
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    file_handler = logging.FileHandler(
-        LOGS_DIR / f"{name}_{timestamp}.log"
+    file_handler = CompressingRotatingFileHandler(
+        LOGS_DIR / f"{name}_{timestamp}_{os.getpid()}.log",
+        name,
+        LOGGING_CONFIG["max_bytes"],
+        LOGGING_CONFIG["rotate_seconds"],
+        LOGGING_CONFIG["backup_count"],
+        LOGGING_CONFIG["retention_days"]
     )
-    file_handler.setLevel(logging.DEBUG)
+    file_handler.setLevel(file_level)
     file_handler.setFormatter(file_formatter)
 
     # Add handlers
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    if listener is not None:
+        queue_handler = BoundedQueueHandler(
+            listener.records, name, LOGGING_CONFIG["drop_policy"], LOGGING_CONFIG["block_timeout"]
+        )
+        listener.add(name, [console_handler, file_handler], queue_handler)
+        logger.addHandler(queue_handler)
+    else:
+        logger.addHandler(console_handler)
+        logger.addHandler(file_handler)
 
-    return logger
\ No newline at end of file
+    return logger
@@ -0,0 +1,175 @@
+"""Opt-in profiling of single requests with cProfile and tracemalloc.
+
+A request is profiled when it carries a valid signed token in the X-Profile
+header or the _profile query parameter. Tokens are "<expiry>.<signature>",
+an HMAC of the expiry time under the admin token, so they can be handed out
+for a limited time without sharing the admin token itself. Mint one with:
+
+    python -m utils.profiling [ttl_seconds]
+
+Requests without a token only pay for a scan of the raw header list.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+import cProfile
+import hashlib
+import hmac
+import marshal
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+
+
+def sign_token(secret: str, expires: int) -> str:
+    signature = hmac.new(secret.encode(), f"profile:{expires}".encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{signature}"
+
+
+def make_token(secret: str, ttl: int = 300) -> str:
+    return sign_token(secret, int(time.time()) + ttl)
+
+
+class Profile:
+    """Collectors for one profiled request"""
+
+    def __init__(self):
+        self.request_id = uuid.uuid4().hex
+        self.created_at = time.time()
+        self.started_tracemalloc = not tracemalloc.is_tracing()
+        if self.started_tracemalloc:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self.profiler = cProfile.Profile()
+        self.start = time.perf_counter()
+        self.profiler.enable()
+        self.duration_ms = 0.0
+        self.snapshot = None
+        self.peak_bytes = 0
+
+    def stop(self):
+        """Stop collecting; cheap enough to run on the event loop"""
+        self.profiler.disable()
+        self.duration_ms = (time.perf_counter() - self.start) * 1000
+        self.snapshot = tracemalloc.take_snapshot()
+        self.peak_bytes = tracemalloc.get_traced_memory()[1]
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+
+
+class RequestProfiler:
+    """Decides which requests to profile and keeps the most recent results.
+
+    cProfile hooks the whole thread, so a profile also covers whatever other
+    requests the event loop interleaved with the profiled one. Only one request
+    is profiled at a time; a token arriving while another profile runs is
+    ignored. Results are kept per worker.
+    """
+
+    def __init__(self, secret: str, header: str, query_param: str, store_size: int = 50, top_n: int = 30):
+        self.secret = secret
+        self.header = header.lower().encode("latin-1")
+        self.query_param = query_param
+        self.query_marker = f"{query_param}=".encode()
+        self.store_size = store_size
+        self.top_n = top_n
+        self.active = False
+        self.profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _token(self, scope) -> Optional[str]:
+        for name, value in scope["headers"]:
+            if name == self.header:
+                return value.decode("latin-1")
+        query = scope.get("query_string", b"")
+        if self.query_marker in query:
+            values = parse_qs(query.decode("latin-1")).get(self.query_param)
+            return values[0] if values else None
+        return None
+
+    def verify(self, token: str) -> bool:
+        expires, _, _ = token.partition(".")
+        if not expires.isdigit() or int(expires) < time.time():
+            return False
+        return hmac.compare_digest(token, sign_token(self.secret, int(expires)))
+
+    def begin(self, scope) -> Optional[Profile]:
+        """Start profiling if the request asks for it with a valid token"""
+        if not self.secret:
+            return None
+        token = self._token(scope)
+        if token is None or self.active or not self.verify(token):
+            return None
+        self.active = True
+        return Profile()
+
+    def end(self, profile: Profile):
+        profile.stop()
+        self.active = False
+
+    def store(self, profile: Profile, method: str, path: str, status: int) -> Dict[str, Any]:
+        """Summarize a stopped profile into the store (blocking; run in a worker thread)"""
+        stats = pstats.Stats(profile.profiler)
+        functions = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:self.top_n]
+        allocations = profile.snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__)
+        ]).statistics("lineno")[:self.top_n]
+
+        record = {
+            "request_id": profile.request_id,
+            "method": method,
+            "path": path,
+            "status": status,
+            "created_at": profile.created_at,
+            "duration_ms": round(profile.duration_ms, 3),
+            "functions": [
+                {
+                    "function": f"{filename}:{line}({name})",
+                    "calls": calls,
+                    "total_ms": round(total * 1000, 3),
+                    "cumulative_ms": round(cumulative * 1000, 3)
+                }
+                for (filename, line, name), (_, calls, total, cumulative, _) in functions
+            ],
+            "memory": {
+                "peak_kb": round(profile.peak_bytes / 1024, 1),
+                "allocations": [
+                    {"location": str(stat.traceback), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+                    for stat in allocations
+                ]
+            },
+            # Raw stats for pstats/snakeviz, served separately
+            "pstats": marshal.dumps(stats.stats)
+        }
+        with self._lock:
+            self.profiles[profile.request_id] = record
+            if len(self.profiles) > self.store_size:
+                self.profiles.popitem(last=False)
+        return record
+
+    def get(self, request_id: str) -> Optional[Dict[str, Any]]:
+        return self.profiles.get(request_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Summaries of the stored profiles, newest first"""
+        keys = ("request_id", "method", "path", "status", "created_at", "duration_ms")
+        with self._lock:
+            records = list(self.profiles.values())
+        return [{key: record[key] for key in keys} for record in reversed(records)]
+
+
+def main():
+    from config import ADMIN_CONFIG
+
+    if not ADMIN_CONFIG["token"]:
+        sys.exit("ADMIN_TOKEN is not set")
+    ttl = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    print(make_token(ADMIN_CONFIG["token"], ttl))
+
+
+if __name__ == "__main__":
+    main()
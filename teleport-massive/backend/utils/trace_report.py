@@ -0,0 +1,104 @@
+"""Summarize span traces written by utils.tracing.
+
+Reads the JSONL trace file plus its rotated backups and prints, per route,
+request latency percentiles, a per-span breakdown and the slowest spans.
+
+Usage: python -m utils.trace_report [traces/spans.jsonl] [--top 5] [--route /game/choice]
+"""
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+import argparse
+import heapq
+import json
+
+
+def trace_files(path: Path) -> List[Path]:
+    """The trace file and its numbered backups, oldest first"""
+    backups = [p for p in path.parent.glob(f"{path.name}.*") if p.suffix[1:].isdigit()]
+    backups.sort(key=lambda p: int(p.suffix[1:]), reverse=True)
+    return backups + ([path] if path.exists() else [])
+
+
+def read_traces(path: Path) -> Iterator[Dict]:
+    for file in trace_files(path):
+        with open(file) as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A partially written last line
+                    continue
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class RouteSummary:
+    def __init__(self, top: int):
+        self.top = top
+        self.durations: List[float] = []
+        self.errors = 0
+        self.spans: Dict[str, List[float]] = defaultdict(list)
+        # Min-heap of (duration_ms, span name, trace_id) keeping the slowest `top` spans
+        self.slowest: List[Tuple[float, str, str]] = []
+
+    def add(self, trace: Dict):
+        self.durations.append(trace["duration_ms"])
+        self.errors += trace["status"] >= 500
+        for span in trace["spans"]:
+            self.spans[span["name"]].append(span["duration_ms"])
+            entry = (span["duration_ms"], span["name"], trace["trace_id"])
+            if len(self.slowest) < self.top:
+                heapq.heappush(self.slowest, entry)
+            elif entry > self.slowest[0]:
+                heapq.heapreplace(self.slowest, entry)
+
+
+def summarize(traces: Iterator[Dict], top: int, route_filter: str = None) -> Dict[str, RouteSummary]:
+    routes: Dict[str, RouteSummary] = {}
+    for trace in traces:
+        key = f"{trace['method']} {trace['route']}"
+        if route_filter and trace["route"] != route_filter:
+            continue
+        if key not in routes:
+            routes[key] = RouteSummary(top)
+        routes[key].add(trace)
+    return routes
+
+
+def print_report(routes: Dict[str, RouteSummary]):
+    # Routes with the most total traced time first
+    for key, summary in sorted(routes.items(), key=lambda item: -sum(item[1].durations)):
+        durations = sorted(summary.durations)
+        print(f"{key}  traces={len(durations)}  5xx={summary.errors}  "
+              f"p50={percentile(durations, 0.5):.2f}ms  p99={percentile(durations, 0.99):.2f}ms")
+        for name, values in sorted(summary.spans.items(), key=lambda item: -sum(item[1])):
+            values.sort()
+            print(f"    {name:<20} count={len(values):<7} p50={percentile(values, 0.5):.3f}ms  "
+                  f"p99={percentile(values, 0.99):.3f}ms  total={sum(values):.1f}ms")
+        print("    slowest spans:")
+        for duration, name, trace_id in sorted(summary.slowest, reverse=True):
+            print(f"      {duration:>10.3f}ms  {name:<20} trace={trace_id}")
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default="traces/spans.jsonl")
+    parser.add_argument("--top", type=int, default=5, help="slowest spans to list per route")
+    parser.add_argument("--route", help="only report this route path, e.g. /game/choice")
+    args = parser.parse_args()
+
+    routes = summarize(read_traces(Path(args.path)), args.top, args.route)
+    if not routes:
+        print(f"No traces found at {args.path}")
+        return
+    print_report(routes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+from collections import deque
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import os
+import random
+import threading
+import time
+import uuid
+
+
+class Trace:
+    """Spans recorded for one sampled request"""
+
+    __slots__ = ("trace_id", "method", "route", "wall_start", "start", "spans", "token")
+
+    def __init__(self, method: str, route: str):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.route = route
+        self.wall_start = time.time()
+        self.start = time.perf_counter()
+        self.spans: List[Tuple[str, float, float]] = []
+        self.token = None
+
+    def to_record(self, status: int) -> Dict[str, Any]:
+        end = time.perf_counter()
+        return {
+            "trace_id": self.trace_id,
+            "ts": round(self.wall_start, 6),
+            "method": self.method,
+            "route": self.route,
+            "status": status,
+            "duration_ms": round((end - self.start) * 1000, 4),
+            "spans": [
+                {
+                    "name": name,
+                    "start_ms": round((started - self.start) * 1000, 4),
+                    "duration_ms": round((ended - started) * 1000, 4)
+                }
+                for name, started, ended in self.spans
+            ]
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+
+class span:
+    """Time a block as a named span of the current request's trace.
+
+    Outside a sampled request this costs one context variable lookup.
+    """
+
+    __slots__ = ("name", "trace", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.trace = _current_trace.get()
+
+    def __enter__(self):
+        if self.trace is not None:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.trace is not None:
+            self.trace.spans.append((self.name, self.started, time.perf_counter()))
+        return False
+
+
+class JsonlExporter:
+    """Append finished traces to a size-rotated JSONL file from a background thread.
+
+    Requests only append to a bounded in-memory buffer; when the writer falls
+    behind, the oldest unwritten traces are dropped and counted.
+    """
+
+    def __init__(self, path: str, max_bytes: int, backup_count: int,
+                 flush_interval: float = 1.0, buffer_size: int = 10000):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.buffer: deque = deque(maxlen=buffer_size)
+        self.exported = 0
+        self.dropped = 0
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def export(self, record: Dict[str, Any]):
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append(record)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        records = []
+        while self.buffer:
+            records.append(self.buffer.popleft())
+        if not records:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write("".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records))
+        self.exported += len(records)
+        if self.path.stat().st_size >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        """spans.jsonl -> spans.jsonl.1 -> ... -> spans.jsonl.<backup_count>, oldest dropped"""
+        for index in range(self.backup_count - 1, 0, -1):
+            source = self.path.with_name(f"{self.path.name}.{index}")
+            if source.exists():
+                os.replace(source, self.path.with_name(f"{self.path.name}.{index + 1}"))
+        if self.backup_count > 0:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+
+class Tracer:
+    """Head-sampled request tracing; the sampling decision is made once per request"""
+
+    def __init__(self, exporter: JsonlExporter, sample_rate: float):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    def start(self, method: str, route: str) -> Optional[Trace]:
+        """Begin a trace for this request if it is sampled, making it current"""
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        trace = Trace(method, route)
+        trace.token = _current_trace.set(trace)
+        return trace
+
+    def finish(self, trace: Trace, status: int):
+        _current_trace.reset(trace.token)
+        self.exporter.export(trace.to_record(status))
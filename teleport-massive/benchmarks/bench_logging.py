@@ -0,0 +1,87 @@
+"""Per-call cost of backend logging, direct versus queue mode.
+
+Times the caller's side of logger.info with the Rich console and file handlers
+attached directly, then behind the bounded queue with output on the listener
+thread. Queue-mode calls run in bursts smaller than the queue, so they measure
+enqueueing rather than drops, and the listener's drain rate is reported
+separately. Also times the request headers debug line when DEBUG is filtered
+out, formatted eagerly with an f-string and lazily with utils.logger.lazy.
+
+Console output goes to /dev/null; it is still fully rendered.
+
+Usage: python benchmarks/bench_logging.py [--calls 20000] [--burst 5000]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from common import BACKEND_DIR
+
+MESSAGE = "Request completed: %s %s - Status: %s - Duration: %.2fms"
+ARGS = ("GET", "/game/state/0b6f4c1e-2d7c-4a38-9a4e-8f1d2c3b4a5e", 200, 1.234)
+
+
+def per_call_us(fn, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--burst", type=int, default=5000, help="queue-mode calls between drains")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        os.environ["LOG_FILE_LEVEL"] = "INFO"
+        sys.path.insert(0, str(BACKEND_DIR))
+        from starlette.datastructures import Headers
+        from utils import logger as logger_module
+
+        logger_module.console.file = open(os.devnull, "w")
+        listener = logger_module.listener
+
+        # Direct handlers: build a logger with the listener switched off
+        logger_module.listener = None
+        direct = logger_module.setup_logger("bench_direct")
+        logger_module.listener = listener
+        queued = logger_module.setup_logger("bench_queue")
+
+        direct_us = per_call_us(lambda: direct.info(MESSAGE, *ARGS), args.calls)
+
+        queued_us = []
+        drain_rates = []
+        remaining = args.calls
+        while remaining > 0:
+            burst = min(args.burst, remaining)
+            queued_us.append(per_call_us(lambda: queued.info(MESSAGE, *ARGS), burst))
+            started = time.perf_counter()
+            while not listener.records.empty():
+                time.sleep(0.001)
+            drain_rates.append(burst / (time.perf_counter() - started))
+            remaining -= burst
+        dropped = sum(handler.dropped for handler in listener.queue_handlers)
+
+        headers = Headers({f"x-header-{i}": "value " * 4 for i in range(12)})
+        eager_us = per_call_us(lambda: queued.debug(f"Headers: {dict(headers)}"), args.calls)
+        lazy_us = per_call_us(lambda: queued.debug("Headers: %s", logger_module.lazy(dict, headers)), args.calls)
+        listener.stop()
+        logging.shutdown()
+
+    print(f"info, direct handlers:         {direct_us:8.2f} us/call")
+    print(f"info, queue (caller side):     {sum(queued_us) / len(queued_us):8.2f} us/call  (dropped {dropped})")
+    print(f"listener drain rate:           {sum(drain_rates) / len(drain_rates):8.0f} records/s")
+    print(f"filtered debug, eager f-string:{eager_us:8.2f} us/call")
+    print(f"filtered debug, lazy:          {lazy_us:8.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Microbenchmark of the metrics recorded by the request middleware.
+
+Times the metric calls api.RequestMiddleware makes per request (route
+resolution, in-flight gauge, latency histogram, status counter), without its
+admission, tracing and logging steps, and compares them with the cost of a
+whole in-process request to GET /game/state/{session_id}, so the overhead can
+be read as a share of request time. Also times a scrape.
+
+Usage: python benchmarks/bench_metrics.py [--iterations 200000] [--requests 5000]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from common import asgi_request, load_app, prepare_workdir
+
+
+def time_per_call(fn, iterations: int) -> float:
+    """Best-of-three mean cost of fn() in microseconds"""
+    best = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        best = min(best, (time.perf_counter() - started) / iterations)
+    return best * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200000, help="recording iterations")
+    parser.add_argument("--requests", type=int, default=5000, help="in-process requests")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = load_app(prepare_workdir(Path(tmp)))
+        api = sys.modules["backend_api"]
+        # Keep console logging out of the request timings
+        logging.getLogger("api").setLevel(logging.WARNING)
+
+        session_id = asyncio.run(asgi_request(app, "POST", "/game/start"))[1]
+        session_id = json.loads(session_id)["session_id"]
+        state_path = f"/game/state/{session_id}"
+        scope = {"type": "http", "method": "GET", "path": state_path, "root_path": ""}
+
+        def record():
+            route = api.resolve_route(app.router.routes, scope)
+            in_flight = api.http_requests_in_flight.labels("GET", route)
+            in_flight.inc()
+            api.http_request_duration.labels("GET", route).observe(0.0042)
+            api.http_requests_total.labels("GET", route, "200").inc()
+            in_flight.dec()
+
+        def record_without_routing():
+            in_flight = api.http_requests_in_flight.labels("GET", "/game/state/{session_id}")
+            in_flight.inc()
+            api.http_request_duration.labels("GET", "/game/state/{session_id}").observe(0.0042)
+            api.http_requests_total.labels("GET", "/game/state/{session_id}", "200").inc()
+            in_flight.dec()
+
+        recording_us = time_per_call(record, args.iterations)
+        counters_us = time_per_call(record_without_routing, args.iterations)
+        scrape_us = time_per_call(api.metrics.render, 2000)
+
+        async def requests_loop():
+            started = time.perf_counter()
+            for _ in range(args.requests):
+                await asgi_request(app, "GET", state_path)
+            return (time.perf_counter() - started) / args.requests * 1e6
+
+        asyncio.run(requests_loop())  # warm up
+        request_us = asyncio.run(requests_loop())
+
+    print(f"metric recording per request:   {recording_us:8.2f} us")
+    print(f"  of which counters/histogram:  {counters_us:8.2f} us")
+    print(f"full in-process request:        {request_us:8.2f} us")
+    print(f"recording share of request:     {recording_us / request_us * 100:8.2f} %")
+    print(f"/metrics render:                {scrape_us:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Measure req/s scaling of backend/api.py from 1 to N uvicorn workers.
+
+For each worker count, starts uvicorn with the shared SQLite session backend
+(SESSION_BACKEND=sqlite) and drives it from several client processes playing
+start -> choice -> state loops. Any non-2xx response, such as a 404 from a
+session created on another worker, is counted as an error.
+
+The client processes share the machine with the server, so give the run
+spare cores: with C cores, benchmark up to roughly C/2 workers.
+
+Usage: python benchmarks/bench_scaling.py [--max-workers 4] [--duration 10] [--json out.json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from common import free_port, prepare_workdir, start_server, stop_server
+
+
+def client_process(base_url: str, threads: int, duration: float, seed: int, results):
+    """Run `threads` players until the deadline; puts (requests, errors) on the queue"""
+    deadline = time.time() + duration
+    totals = {"requests": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def player(index: int):
+        rng = random.Random(seed * 1000 + index)
+        http = requests.Session()
+        done = errors = 0
+        node = session_id = None
+        while time.time() < deadline:
+            if node is None or not node["choices"]:
+                response = http.post(f"{base_url}/game/start")
+                payload = response.json() if response.ok else None
+                session_id, node = (payload["session_id"], payload["node"]) if payload else (None, None)
+            else:
+                choice = rng.choice(node["choices"])
+                response = http.post(f"{base_url}/game/choice",
+                                     params={"session_id": session_id, "choice_id": choice["id"]})
+                node = response.json()["node"] if response.ok else None
+                if response.ok:
+                    done += 1
+                    response = http.get(f"{base_url}/game/state/{session_id}", params={"since": 0})
+            done += 1
+            errors += not response.ok
+        with lock:
+            totals["requests"] += done
+            totals["errors"] += errors
+
+    workers = [threading.Thread(target=player, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    results.put((totals["requests"], totals["errors"]))
+
+
+def run(workers: int, clients: int, threads: int, duration: float):
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = prepare_workdir(Path(tmp))
+        port = free_port()
+        server = start_server(workdir, port, workers=workers, env={
+            "SESSION_BACKEND": "sqlite",
+            "SESSION_DB_PATH": str(workdir / "sessions.db"),
+            "STATS_DB_PATH": str(workdir / "stats.db")
+        })
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            results = multiprocessing.Queue()
+            processes = [
+                multiprocessing.Process(target=client_process, args=(base_url, threads, duration, i, results))
+                for i in range(clients)
+            ]
+            started = time.time()
+            for process in processes:
+                process.start()
+            collected = [results.get() for _ in processes]
+            for process in processes:
+                process.join()
+            elapsed = time.time() - started
+        finally:
+            stop_server(server)
+
+    total = sum(r for r, _ in collected)
+    errors = sum(e for _, e in collected)
+    return {"workers": workers, "requests": total, "errors": errors, "req_per_s": round(total / elapsed, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--clients", type=int, help="client processes (default: 2 per worker at max)")
+    parser.add_argument("--threads", type=int, default=8, help="players per client process")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per worker count")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+    clients = args.clients or 2 * args.max_workers
+
+    rows = []
+    for workers in range(1, args.max_workers + 1):
+        row = run(workers, clients, args.threads, args.duration)
+        row["efficiency"] = round(row["req_per_s"] / (workers * rows[0]["req_per_s"]), 3) if rows else 1.0
+        rows.append(row)
+        print(f"workers={row['workers']:<3} req/s={row['req_per_s']:<10} "
+              f"efficiency={row['efficiency']:<6} errors={row['errors']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
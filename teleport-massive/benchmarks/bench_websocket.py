@@ -0,0 +1,163 @@
+"""Compare per-choice latency and connection cost of the REST and WebSocket play paths.
+
+Starts backend/api.py under uvicorn on localhost with a synthetic story, then:
+
+1. plays N sequential choices over REST (keep-alive session) and over one socket;
+2. holds C concurrent players on each path and measures choice latency, choice
+   throughput and the server's resident memory per connection.
+
+Usage: python benchmarks/bench_websocket.py [--choices 2000] [--connections 200] [--json out.json]
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+import websockets
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from common import free_port, prepare_workdir, rss_kb, start_server, stop_server, summarize
+
+
+def rest_player(base_url: str, choices: int, seed: int):
+    """Play `choices` choices over REST, restarting at endings; returns latencies in ms"""
+    rng = random.Random(seed)
+    http = requests.Session()
+    node = http.post(f"{base_url}/game/start").json()
+    session_id, node = node["session_id"], node["node"]
+    latencies = []
+    for _ in range(choices):
+        if not node["choices"]:
+            start = http.post(f"{base_url}/game/start").json()
+            session_id, node = start["session_id"], start["node"]
+        choice = rng.choice(node["choices"])
+        started = time.perf_counter()
+        response = http.post(f"{base_url}/game/choice", params={"session_id": session_id, "choice_id": choice["id"]})
+        latencies.append((time.perf_counter() - started) * 1000)
+        node = response.json()["node"]
+    return latencies
+
+
+async def socket_session(base_url: str, ws_url: str, http: requests.Session):
+    session_id = http.post(f"{base_url}/game/start").json()["session_id"]
+    websocket = await websockets.connect(f"{ws_url}/ws/game/{session_id}", max_size=None)
+    node = json.loads(await websocket.recv())["node"]
+    await websocket.recv()  # prefetch
+    return websocket, node
+
+
+async def socket_player(base_url: str, ws_url: str, choices: int, seed: int, http: requests.Session):
+    """Play `choices` choices over one socket per session; returns latencies in ms"""
+    rng = random.Random(seed)
+    websocket, node = await socket_session(base_url, ws_url, http)
+    latencies = []
+    try:
+        for _ in range(choices):
+            if not node["choices"]:
+                await websocket.close()
+                websocket, node = await socket_session(base_url, ws_url, http)
+            choice = rng.choice(node["choices"])
+            started = time.perf_counter()
+            await websocket.send(json.dumps({"type": "choice", "choice_id": choice["id"]}))
+            node = json.loads(await websocket.recv())["node"]
+            latencies.append((time.perf_counter() - started) * 1000)
+            await websocket.recv()  # prefetch
+    finally:
+        await websocket.close()
+    return latencies
+
+
+def concurrent_rest(base_url: str, connections: int, rounds: int):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=connections) as pool:
+        results = list(pool.map(lambda i: rest_player(base_url, rounds, i), range(connections)))
+    elapsed = time.perf_counter() - started
+    latencies = [value for result in results for value in result]
+    return latencies, len(latencies) / elapsed
+
+
+async def concurrent_sockets(base_url: str, ws_url: str, connections: int, rounds: int, pid: int):
+    """Open all sockets first so the RSS delta reflects idle connection cost"""
+    http = requests.Session()
+    before = rss_kb(pid)
+    opened = [await socket_session(base_url, ws_url, http) for _ in range(connections)]
+    held_kb = rss_kb(pid) - before
+
+    async def drive(index, websocket, node):
+        rng = random.Random(index)
+        latencies = []
+        for _ in range(rounds):
+            if not node["choices"]:
+                break
+            choice = rng.choice(node["choices"])
+            started = time.perf_counter()
+            await websocket.send(json.dumps({"type": "choice", "choice_id": choice["id"]}))
+            node = json.loads(await websocket.recv())["node"]
+            latencies.append((time.perf_counter() - started) * 1000)
+            await websocket.recv()
+        await websocket.close()
+        return latencies
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(drive(i, ws, node) for i, (ws, node) in enumerate(opened)))
+    elapsed = time.perf_counter() - started
+    latencies = [value for result in results for value in result]
+    return latencies, len(latencies) / elapsed, held_kb / max(connections, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--choices", type=int, default=2000, help="sequential choices per path")
+    parser.add_argument("--connections", type=int, default=200, help="concurrent players per path")
+    parser.add_argument("--rounds", type=int, default=5, help="choices per concurrent player")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = prepare_workdir(Path(tmp))
+        port = free_port()
+        server = start_server(workdir, port)
+        base_url, ws_url = f"http://127.0.0.1:{port}", f"ws://127.0.0.1:{port}"
+        try:
+            rest_player(base_url, 50, 0)  # warm up
+            rest_sequential = summarize(rest_player(base_url, args.choices, 1))
+            ws_sequential = summarize(asyncio.run(socket_player(base_url, ws_url, args.choices, 1, requests.Session())))
+
+            rest_latencies, rest_rate = concurrent_rest(base_url, args.connections, args.rounds)
+            ws_latencies, ws_rate, kb_per_socket = asyncio.run(
+                concurrent_sockets(base_url, ws_url, args.connections, args.rounds, server.pid)
+            )
+        finally:
+            stop_server(server)
+
+    results = {
+        "sequential": {"rest": rest_sequential, "websocket": ws_sequential},
+        "concurrent": {
+            "connections": args.connections,
+            "rest": {**summarize(rest_latencies), "choices_per_s": round(rest_rate, 1)},
+            "websocket": {**summarize(ws_latencies), "choices_per_s": round(ws_rate, 1),
+                          "server_kb_per_connection": round(kb_per_socket, 1)}
+        }
+    }
+
+    print(f"{'path':<12}{'mode':<12}{'p50 ms':>10}{'p99 ms':>10}{'choices/s':>12}")
+    for path in ("rest", "websocket"):
+        seq = results["sequential"][path]
+        conc = results["concurrent"][path]
+        print(f"{path:<12}{'sequential':<12}{seq['p50_ms']:>10}{seq['p99_ms']:>10}{'':>12}")
+        print(f"{path:<12}{'concurrent':<12}{conc['p50_ms']:>10}{conc['p99_ms']:>10}{conc['choices_per_s']:>12}")
+    print(f"server memory per open socket: {results['concurrent']['websocket']['server_kb_per_connection']} KiB")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
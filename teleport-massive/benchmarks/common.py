@@ -0,0 +1,170 @@
+"""Shared helpers for the backend benchmarks.
+
+Benchmarks run backend/api.py against a synthetic story written into a scratch
+directory, so they do not depend on the story files present on the machine.
+"""
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+# Loads backend/api.py by path: the backend/api/ package shadows it for plain imports
+APP_SHIM = f'''import importlib.util
+import sys
+
+sys.path.insert(0, {str(BACKEND_DIR)!r})
+_spec = importlib.util.spec_from_file_location("backend_api", {str(BACKEND_DIR / "api.py")!r})
+backend_api = importlib.util.module_from_spec(_spec)
+sys.modules["backend_api"] = backend_api
+_spec.loader.exec_module(backend_api)
+app = backend_api.app
+'''
+
+
+def build_story(layers: int = 8, width: int = 12, branching: int = 3,
+                content_size: int = 600, seed: int = 7) -> Dict:
+    """Build a layered story graph; every node in the last layer is an ending"""
+    rng = random.Random(seed)
+    filler = ("The corridor hums with borrowed time. " * (content_size // 38 + 1))[:content_size]
+    nodes = []
+    for layer in range(layers):
+        for index in range(width):
+            node_id = f"n{layer}_{index}"
+            choices = []
+            if layer < layers - 1:
+                for choice_index, target in enumerate(rng.sample(range(width), min(branching, width))):
+                    choices.append({
+                        "id": f"{node_id}_c{choice_index}",
+                        "text": f"Step through door {target}",
+                        "target_node_id": f"n{layer + 1}_{target}"
+                    })
+            nodes.append({
+                "id": node_id,
+                "type": "ending" if layer == layers - 1 else "scene",
+                "title": f"Scene {layer}.{index}",
+                "content": filler,
+                "choices": choices
+            })
+    return {"start_node_id": "n0_0", "nodes": nodes}
+
+
+def prepare_workdir(workdir: Path, story: Optional[Dict] = None, story_id: str = "quantum_paradox") -> Path:
+    """Write a story and the app shim into a scratch directory used as the server cwd"""
+    workdir = Path(workdir)
+    (workdir / "stories").mkdir(parents=True, exist_ok=True)
+    with open(workdir / "stories" / f"{story_id}.json", "w") as f:
+        json.dump(story or build_story(), f)
+    (workdir / "benchapp.py").write_text(APP_SHIM)
+    return workdir
+
+
+def load_app(workdir: Path):
+    """Import the app in-process with `workdir` as the current directory"""
+    os.chdir(workdir)
+    sys.path.insert(0, str(workdir))
+    import benchapp
+    return benchapp.app
+
+
+async def asgi_request(app, method: str, path: str, query: str = "", body: bytes = b"") -> Tuple[int, bytes]:
+    """Send one HTTP request straight into an ASGI app; returns status and body"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "root_path": "",
+        "headers": [(b"host", b"bench"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80)
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    status = 0
+    chunks = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workdir: Path, port: int, workers: int = 1, env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    """Start uvicorn on localhost in a subprocess and wait until it accepts connections"""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchapp:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=workdir,
+        env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Server did not start within 30s")
+
+
+def stop_server(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def rss_kb(pid: int) -> int:
+    """Resident set size of a process in KiB (Linux only, 0 elsewhere)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    """Count, mean and percentiles of a list of latencies in milliseconds"""
+    if not samples_ms:
+        return {"count": 0}
+    ordered = sorted(samples_ms)
+
+    def pct(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": round(pct(50), 3),
+        "p99_ms": round(pct(99), 3),
+        "max_ms": round(ordered[-1], 3)
+    }
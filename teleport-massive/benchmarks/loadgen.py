@@ -0,0 +1,291 @@
+"""Load generator for backend/api.py with scripted player populations.
+
+Each simulated player starts a session, makes up to --choices choices (polling
+GET /game/state every --poll-every choices), then starts a new session and
+repeats until the run ends. --players players run concurrently on one event loop.
+
+Two transports:
+
+- asgi (default): requests go straight into the app in this process. This
+  measures the app's own cost, without sockets or HTTP parsing.
+- http: the app runs under uvicorn on localhost with --workers processes, and
+  each player holds one keep-alive connection.
+
+Reports req/s and p50/p99 latency per endpoint. --json writes the results, and
+--baseline compares this run against an earlier results file.
+
+Usage: python benchmarks/loadgen.py [--transport asgi|http] [--players 50] [--duration 10]
+                                    [--choices 10] [--poll-every 1] [--json out.json]
+                                    [--baseline previous.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from common import asgi_request, free_port, load_app, prepare_workdir, start_server, stop_server, summarize
+
+
+class AsgiTransport:
+    """Calls the ASGI app directly"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def connect(self) -> "AsgiTransport":
+        return self
+
+    async def request(self, method: str, path: str, query: str = "") -> Tuple[int, bytes]:
+        # An in-process request against the memory store may never suspend;
+        # yield so one player cannot hold the loop until the deadline
+        await asyncio.sleep(0)
+        return await asgi_request(self.app, method, path, query)
+
+    async def close(self):
+        pass
+
+
+class HttpConnection:
+    """Minimal HTTP/1.1 keep-alive client for one player.
+
+    uvicorn always answers these requests with a Content-Length body, so there
+    is no chunked decoding here.
+    """
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, query: str = "") -> Tuple[int, bytes]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        target = f"{path}?{query}" if query else path
+        self.writer.write(
+            f"{method} {target} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\nContent-Length: 0\r\n\r\n".encode()
+        )
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            await self.close()
+            raise ConnectionError("Server closed the connection")
+        status = int(status_line.split()[1])
+        length = 0
+        keep_alive = True
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name = name.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "connection" and value.strip().lower() == "close":
+                keep_alive = False
+        body = await self.reader.readexactly(length)
+        if not keep_alive:
+            await self.close()
+        return status, body
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = self.reader = None
+
+
+class HttpTransport:
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+
+    def connect(self) -> HttpConnection:
+        return HttpConnection(self.host, self.port)
+
+
+class Recorder:
+    """Latencies and error counts per endpoint"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.recording = False
+
+    def add(self, endpoint: str, started: float, status: int):
+        if not self.recording:
+            return
+        self.latencies[endpoint].append((time.perf_counter() - started) * 1000)
+        if not 200 <= status < 300:
+            self.errors[endpoint] += 1
+
+
+async def player(transport, recorder: Recorder, deadline: float, choices: int, poll_every: int,
+                 think_ms: float, seed: int):
+    """Play start -> choices (with state polls) -> start ... until the deadline"""
+    rng = random.Random(seed)
+    connection = transport.connect()
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                status, body = await connection.request("POST", "/game/start")
+            except (ConnectionError, asyncio.IncompleteReadError):
+                recorder.add("POST /game/start", started, 0)
+                continue
+            recorder.add("POST /game/start", started, status)
+            if status != 200:
+                continue
+            payload = json.loads(body)
+            session_id, node = payload["session_id"], payload["node"]
+
+            for step in range(1, choices + 1):
+                if not node["choices"] or time.perf_counter() >= deadline:
+                    break
+                if think_ms:
+                    await asyncio.sleep(rng.expovariate(1 / think_ms) / 1000)
+                choice = rng.choice(node["choices"])
+                started = time.perf_counter()
+                status, body = await connection.request(
+                    "POST", "/game/choice", f"session_id={session_id}&choice_id={choice['id']}"
+                )
+                recorder.add("POST /game/choice", started, status)
+                if status != 200:
+                    break
+                node = json.loads(body)["node"]
+
+                if poll_every and step % poll_every == 0:
+                    started = time.perf_counter()
+                    status, _ = await connection.request("GET", f"/game/state/{session_id}", f"since={step}")
+                    recorder.add("GET /game/state/{session_id}", started, status)
+    finally:
+        await connection.close()
+
+
+async def run_load(transport, args) -> Tuple[Recorder, float]:
+    recorder = Recorder()
+    # Players start unmeasured for the warmup, then recording switches on
+    deadline = time.perf_counter() + args.warmup + args.duration
+    tasks = [
+        asyncio.ensure_future(player(transport, recorder, deadline, args.choices, args.poll_every,
+                                     args.think_ms, args.seed * 100000 + index))
+        for index in range(args.players)
+    ]
+    await asyncio.sleep(args.warmup)
+    recorder.recording = True
+    started = time.perf_counter()
+    await asyncio.gather(*tasks)
+    return recorder, time.perf_counter() - started
+
+
+def build_results(recorder: Recorder, elapsed: float, args) -> Dict:
+    endpoints = {}
+    for endpoint, latencies in sorted(recorder.latencies.items()):
+        endpoints[endpoint] = {
+            "req_per_s": round(len(latencies) / elapsed, 1),
+            "errors": recorder.errors[endpoint],
+            **summarize(latencies)
+        }
+    total = sum(len(latencies) for latencies in recorder.latencies.values())
+    return {
+        "config": {
+            "transport": args.transport, "players": args.players, "duration": args.duration,
+            "choices": args.choices, "poll_every": args.poll_every, "think_ms": args.think_ms,
+            "workers": args.workers if args.transport == "http" else None, "seed": args.seed
+        },
+        "elapsed_s": round(elapsed, 3),
+        "total": {
+            "requests": total,
+            "errors": sum(recorder.errors.values()),
+            "req_per_s": round(total / elapsed, 1)
+        },
+        "endpoints": endpoints
+    }
+
+
+def change(current: float, previous: float) -> str:
+    if not previous:
+        return ""
+    return f" ({(current - previous) / previous * 100:+.1f}%)"
+
+
+def print_results(results: Dict, baseline: Optional[Dict] = None):
+    base_endpoints = baseline["endpoints"] if baseline else {}
+    print(f"{'endpoint':<32} {'req/s':>22} {'p50 ms':>20} {'p99 ms':>20} {'errors':>7}")
+    for endpoint, row in results["endpoints"].items():
+        base = base_endpoints.get(endpoint, {})
+        print(f"{endpoint:<32} "
+              f"{str(row['req_per_s']) + change(row['req_per_s'], base.get('req_per_s')):>22} "
+              f"{str(row['p50_ms']) + change(row['p50_ms'], base.get('p50_ms')):>20} "
+              f"{str(row['p99_ms']) + change(row['p99_ms'], base.get('p99_ms')):>20} "
+              f"{row['errors']:>7}")
+    total = results["total"]
+    base_total = baseline["total"]["req_per_s"] if baseline else None
+    print(f"{'total':<32} {str(total['req_per_s']) + change(total['req_per_s'], base_total):>22} "
+          f"{'':>20} {'':>20} {total['errors']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transport", choices=["asgi", "http"], default="asgi")
+    parser.add_argument("--players", type=int, default=50, help="concurrent players")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before recording")
+    parser.add_argument("--choices", type=int, default=10, help="choices per session before starting anew")
+    parser.add_argument("--poll-every", type=int, default=1, help="poll state every N choices (0 disables)")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="mean pause before each choice")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for --transport http")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="results file from an earlier run to compare against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = prepare_workdir(Path(tmp))
+        if args.transport == "asgi":
+            app = load_app(workdir)
+            # Keep console logging out of the request timings
+            logging.getLogger("api").setLevel(logging.WARNING)
+
+            async def run_in_process():
+                await app.router.startup()
+                try:
+                    return await run_load(AsgiTransport(app), args)
+                finally:
+                    await app.router.shutdown()
+
+            recorder, elapsed = asyncio.run(run_in_process())
+        else:
+            port = free_port()
+            server = start_server(workdir, port, workers=args.workers, env={
+                "SESSION_BACKEND": "sqlite" if args.workers > 1 else "memory",
+                "SESSION_DB_PATH": str(workdir / "sessions.db"),
+                "STATS_DB_PATH": str(workdir / "stats.db")
+            })
+            try:
+                recorder, elapsed = asyncio.run(run_load(HttpTransport("127.0.0.1", port), args))
+            finally:
+                stop_server(server)
+
+    results = build_results(recorder, elapsed, args)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
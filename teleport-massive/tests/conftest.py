@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# Backend modules import each other as top-level packages (game.x, utils.x)
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
@@ -0,0 +1,37 @@
+"""Smoke test for benchmarks/loadgen.py over the in-process transport"""
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+BENCHMARKS_DIR = Path(__file__).resolve().parents[2] / "benchmarks"
+sys.path.insert(0, str(BENCHMARKS_DIR))
+
+from common import load_app, prepare_workdir  # noqa: E402
+from loadgen import AsgiTransport, build_results, run_load  # noqa: E402
+
+
+def test_asgi_run_records_requests(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    app = load_app(prepare_workdir(tmp_path))
+    logging.getLogger("api").setLevel(logging.WARNING)
+    args = argparse.Namespace(
+        transport="asgi", players=5, duration=0.5, warmup=0.2, choices=5, poll_every=1,
+        think_ms=0.0, workers=1, seed=1
+    )
+
+    async def run():
+        await app.router.startup()
+        try:
+            return await run_load(AsgiTransport(app), args)
+        finally:
+            await app.router.shutdown()
+
+    recorder, elapsed = asyncio.run(run())
+    results = build_results(recorder, elapsed, args)
+
+    assert elapsed >= 0.4
+    assert results["total"]["requests"] > 0
+    assert results["total"]["errors"] == 0
+    assert "POST /game/choice" in results["endpoints"]
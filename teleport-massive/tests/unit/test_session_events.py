@@ -0,0 +1,137 @@
+"""Event derivation and replay, and the event-sourced store against the row store"""
+import random
+from typing import Any, Dict, List
+
+import pytest
+from pydantic import BaseModel
+
+from game.session_events import derive_events, replay, state_dict
+from game.session_store import EventSourcedSessionStore, SessionConflictError, SQLiteSessionStore
+
+
+class GameState(BaseModel):
+    """Same shape as api.GameState, which cannot be imported without starting the app"""
+    session_id: str
+    story_id: str = "default"
+    current_node_id: str
+    history: List[str] = []
+    player_attributes: Dict[str, Any] = {}
+    version: int = 0
+
+
+def mutate(rng: random.Random, game_state: GameState):
+    """One random change of the kinds the API makes, plus the odd arbitrary one"""
+    roll = rng.random()
+    if roll < 0.5:
+        for _ in range(rng.randint(1, 3)):
+            game_state.history.append(game_state.current_node_id)
+            game_state.current_node_id = f"n{rng.randrange(30)}"
+    elif roll < 0.75:
+        game_state.player_attributes[f"a{rng.randrange(5)}"] = rng.choice([1, "x", None, [1, 2]])
+    elif roll < 0.85:
+        game_state.player_attributes.pop(f"a{rng.randrange(5)}", None)
+    elif roll < 0.92:
+        game_state.history = game_state.history[:rng.randrange(len(game_state.history) + 1)]
+    else:
+        game_state.story_id = rng.choice(["default", "other"])
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_replay_of_derived_events_reproduces_state(seed):
+    rng = random.Random(seed)
+    before = GameState(session_id="s", current_node_id="start")
+    state = replay(None, derive_events(None, before))
+    for _ in range(200):
+        after = before.copy(deep=True)
+        mutate(rng, after)
+        state = replay(state, derive_events(before, after))
+        assert state == state_dict(after)
+        before = after
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_event_store_round_trip_matches_row_store(tmp_path, seed):
+    rng = random.Random(seed)
+    events = EventSourcedSessionStore(str(tmp_path / "events.db"), GameState, snapshot_interval=4)
+    rows = SQLiteSessionStore(str(tmp_path / "rows.db"), GameState)
+    session_ids = [f"s{i}" for i in range(5)]
+    for session_id in session_ids:
+        for store in (events, rows):
+            store.create(GameState(session_id=session_id, current_node_id="start"))
+
+    for _ in range(300):
+        session_id = rng.choice(session_ids)
+        change = rng.random()
+        for store in (events, rows):
+            game_state = store.get(session_id)
+            # Same seed, so both stores see the same change
+            mutate(random.Random(change), game_state)
+            store.save(game_state)
+
+    # Fresh instances have no cache, so these rebuild from snapshots and events
+    reopened = EventSourcedSessionStore(str(tmp_path / "events.db"), GameState, snapshot_interval=4)
+    for session_id in session_ids:
+        expected = state_dict(rows.get(session_id))
+        assert state_dict(events.get(session_id)) == expected
+        assert state_dict(reopened.get(session_id)) == expected
+
+
+@pytest.mark.parametrize("store_class", [EventSourcedSessionStore, SQLiteSessionStore])
+def test_concurrent_save_conflicts(tmp_path, store_class):
+    # Two stores on one database stand in for two workers
+    db_path = str(tmp_path / "sessions.db")
+    first, second = store_class(db_path, GameState), store_class(db_path, GameState)
+    first.create(GameState(session_id="s", current_node_id="start"))
+
+    mine, theirs = first.get("s"), second.get("s")
+    mine.history.append(mine.current_node_id)
+    mine.current_node_id = "left"
+    first.save(mine)
+
+    theirs.history.append(theirs.current_node_id)
+    theirs.current_node_id = "right"
+    with pytest.raises(SessionConflictError):
+        second.save(theirs)
+
+    # After a conflict the loser re-reads the winner's state and can save on top of it
+    retry = second.get("s")
+    assert retry.current_node_id == "left"
+    retry.player_attributes["retried"] = True
+    second.save(retry)
+    assert state_dict(first.get("s")) == state_dict(retry)
+
+
+def test_event_store_catches_up_on_other_workers_events(tmp_path):
+    db_path = str(tmp_path / "events.db")
+    first = EventSourcedSessionStore(db_path, GameState, snapshot_interval=1000)
+    second = EventSourcedSessionStore(db_path, GameState, snapshot_interval=1000)
+    first.create(GameState(session_id="s", current_node_id="n0"))
+    first.get("s")
+
+    for i in range(1, 6):
+        game_state = second.get("s")
+        game_state.history.append(game_state.current_node_id)
+        game_state.current_node_id = f"n{i}"
+        second.save(game_state)
+
+    caught_up = first.get("s")
+    assert caught_up.history == ["n0", "n1", "n2", "n3", "n4"]
+    assert caught_up.current_node_id == "n5"
+    assert caught_up.version == second.get("s").version
+
+
+def test_read_events_sees_only_committed_events(tmp_path):
+    store = EventSourcedSessionStore(str(tmp_path / "events.db"), GameState)
+    store.create(GameState(session_id="s", current_node_id="start"))
+    committed = store.read_events()
+    assert [event["session_id"] for event in committed] == ["s"]
+
+    # An append still open on the event-loop connection, as _append leaves it
+    # between BEGIN and COMMIT or ROLLBACK
+    store.connection.execute("BEGIN")
+    store.connection.execute(
+        "INSERT INTO session_events (session_id, seq, type, data, created_at) VALUES ('s', 2, 'move', '{}', 0)"
+    )
+    assert store.read_events() == committed
+    store.connection.execute("ROLLBACK")
+    assert store.read_events() == committed
@@ -0,0 +1,28 @@
+"""Visit counters survive a failed flush"""
+import sqlite3
+
+import pytest
+
+from game.stats import StatsCollector
+
+
+def test_restored_deltas_are_written_by_the_next_flush(tmp_path):
+    # A directory in place of the database file makes every write fail
+    (tmp_path / "stats.db").mkdir()
+    stats = StatsCollector(str(tmp_path / "stats.db"))
+    stats.record_transition("story", "a", "b")
+    stats.record_transition("story", "b", "end", is_ending=True)
+
+    deltas = stats.drain()
+    with pytest.raises(sqlite3.Error):
+        stats.write(deltas)
+    stats.restore(deltas)
+    stats.record_transition("story", "a", "b")
+
+    stats.db_path = tmp_path / "stats.sqlite"
+    stats.write(stats.drain())
+    totals = stats.read("story")
+    assert {node_id: entry["visits"] for node_id, entry in totals["nodes"].items()} == {"b": 2, "end": 1}
+    assert totals["endings"] == {"end": 1}
+    assert {(t["from"], t["to"]): t["count"] for t in totals["transitions"]} == {("a", "b"): 2, ("b", "end"): 1}
+    assert not stats.pending
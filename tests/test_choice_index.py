@@ -0,0 +1,89 @@
+"""ChoiceIndex checked against a full is_accessible scan"""
+import random
+
+import pytest
+
+from cli_app import StoryNode, TeleportMassiveGame, TrackedAttributes
+
+ATTRIBUTES = [f"a{i}" for i in range(12)]
+
+
+def full_scan(game: TeleportMassiveGame):
+    attributes = game.game_state["player_attributes"]
+    current_node = game.get_node(game.game_state["current_node_id"])
+    return [
+        choice_text for choice_text, child_node_id in current_node.child_choices.items()
+        if game.get_node(child_node_id) and game.get_node(child_node_id).is_accessible(attributes)
+    ]
+
+
+def make_game(rng: random.Random, size: int = 40) -> TeleportMassiveGame:
+    game = TeleportMassiveGame(persist_state=False)
+    game.add_node(StoryNode("hub", "Hub", "hub"))
+    game.add_choice("node_root", "to hub", "hub")
+    for i in range(size):
+        node = StoryNode(f"c{i}", f"C{i}", "c")
+        if i % 4:
+            node.metadata["requirements"] = {rng.choice(ATTRIBUTES): rng.randint(0, 2) for _ in range(2)}
+        game.add_node(node)
+        game.add_choice("hub", f"choice {i}", node.id)
+        game.add_choice(node.id, "back", "hub")
+    game.update_game_state("to hub", "hub")
+    return game
+
+
+def test_tracked_attributes_record_changed_names():
+    attributes = TrackedAttributes(a=1, b=2)
+    assert attributes.changed == set()
+    attributes["a"] = 3
+    attributes.update(c=4)
+    attributes |= {"d": 5}
+    del attributes["b"]
+    attributes.pop("missing", None)
+    attributes.setdefault("e", 6)
+    assert attributes.changed == {"a", "b", "c", "d", "e", "missing"}
+    attributes.changed.clear()
+    attributes.clear()
+    assert attributes.changed == {"a", "c", "d", "e"}
+    assert attributes == {}
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_full_scan_under_random_changes(seed):
+    rng = random.Random(seed)
+    game = make_game(rng)
+    for step in range(1000):
+        attributes = game.game_state["player_attributes"]
+        name = rng.choice(ATTRIBUTES)
+        roll = rng.random()
+        if roll < 0.4:
+            attributes[name] = rng.randint(0, 2)
+        elif roll < 0.5:
+            attributes.pop(name, None)
+        elif roll < 0.6:
+            attributes.update({name: rng.randint(0, 2)})
+        elif roll < 0.62:
+            # Wholesale replacement with a plain dict, as a loaded state would be
+            game.game_state["player_attributes"] = {a: rng.randint(0, 2) for a in ATTRIBUTES}
+        elif roll < 0.65:
+            node = StoryNode(f"new{step}", "New", "n")
+            node.metadata["requirements"] = {name: 1}
+            game.add_node(node)
+            game.add_choice("hub", f"new {step}", node.id)
+        elif roll < 0.8:
+            choices = game.get_available_choices()
+            if choices:
+                current_node = game.get_node(game.game_state["current_node_id"])
+                game.update_game_state(choices[0], current_node.child_choices[choices[0]])
+        assert game.get_available_choices() == full_scan(game), f"step {step}"
+
+
+def test_replacing_a_node_drops_cached_results():
+    game = make_game(random.Random(0))
+    game.get_available_choices()
+    locked = StoryNode("c0", "C0", "c")
+    locked.metadata["requirements"] = {"key": True}
+    game.add_node(locked)
+    assert "choice 0" not in game.get_available_choices()
+    game.game_state["player_attributes"]["key"] = True
+    assert game.get_available_choices() == full_scan(game)
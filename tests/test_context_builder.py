@@ -0,0 +1,48 @@
+"""ContextBuilder keeps prompts within the token budget"""
+import random
+
+import pytest
+
+from cli_app import ContextBuilder, StoryContext, StoryNode, estimate_tokens
+
+
+def build_path(rng: random.Random, steps: int, max_length: int):
+    context = StoryContext()
+    nodes = {}
+    for i in range(steps):
+        sentences = ". ".join("word " * rng.randint(1, 20) for _ in range(rng.randint(1, 5)))
+        node = StoryNode(f"n{i}", f"Scene {i}", (sentences * 50)[:rng.randint(1, max_length)])
+        nodes[node.id] = node
+        context.append(node)
+    return context, nodes
+
+
+@pytest.mark.parametrize("steps", [1, 2, 50])
+def test_oversized_current_node_stays_within_budget(steps):
+    context, nodes = build_path(random.Random(steps), steps - 1, 200)
+    current = StoryNode("current", "Current", "x" * 10000)
+    nodes[current.id] = current
+    context.append(current)
+    for token_budget in (1, 5, 8, 64, 1024):
+        prompt = ContextBuilder(token_budget).build(context, nodes)
+        assert estimate_tokens(prompt) <= token_budget
+        assert prompt.endswith("x")
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_paths_stay_within_budget(seed):
+    rng = random.Random(seed)
+    context, nodes = build_path(rng, 300, 2000)
+    for _ in range(50):
+        token_budget = rng.randint(0, 600)
+        prompt = ContextBuilder(token_budget, summary_tokens=rng.randint(4, 40)).build(context, nodes)
+        assert estimate_tokens(prompt) <= token_budget
+
+
+def test_earlier_scenes_are_summarized_then_counted():
+    context, nodes = build_path(random.Random(0), 100, 200)
+    prompt = ContextBuilder(200).build(context, nodes)
+    assert prompt.startswith("[")
+    assert "earlier scenes omitted]" in prompt
+    assert "Earlier in the story:\n- " in prompt
+    assert estimate_tokens(prompt) <= 200
@@ -0,0 +1,44 @@
+"""Headless script runs leave the story graph they play untouched"""
+import hashlib
+
+import pytest
+
+from cli_app import StoryNode, TeleportMassiveGame, run_headless
+
+
+def build_graph(path, shard_size=None):
+    game = TeleportMassiveGame(persist_state=False)
+    previous = game.root_node_id
+    for i in range(40):
+        game.add_node(StoryNode(f"n{i}", f"N{i}", f"Scene {i}."))
+        game.add_choice(previous, f"go {i}", f"n{i}")
+        previous = f"n{i}"
+    game.save_story_graph(str(path), shard_size)
+
+
+def digests(path):
+    files = sorted(path.iterdir()) if path.is_dir() else [path]
+    return {file.name: hashlib.md5(file.read_bytes()).hexdigest() for file in files}
+
+
+@pytest.mark.parametrize("layout", ["json", "sharded"])
+def test_graph_files_unchanged_after_run(tmp_path, layout):
+    graph = tmp_path / ("graph.json" if layout == "json" else "graph")
+    build_graph(graph, shard_size=2 if layout == "sharded" else None)
+    before = digests(graph)
+    script = tmp_path / "walk.txt"
+    script.write_text("\n".join(f"go {i}" for i in range(40)) + "\n=n39\n---\ngo 0\n=n0\n")
+
+    assert run_headless([str(script)], str(graph)) == 0
+    assert digests(graph) == before
+
+
+def test_read_only_graph_refuses_changes(tmp_path):
+    graph = tmp_path / "graph"
+    build_graph(graph, shard_size=4)
+    game = TeleportMassiveGame(persist_state=False)
+    game.load_story_graph(str(graph), read_only=True)
+    with pytest.raises(TypeError):
+        game.add_node(StoryNode("extra", "Extra", "x"))
+    with pytest.raises(TypeError):
+        game.save_story_graph(str(graph))